@@ -0,0 +1,144 @@
+'''
+Times the hot spots of the maze, mapper, planner and simulator over a range
+of maze sizes and writes the results as JSON, e.g.
+
+    python benchmark.py [output.json] [size ...]
+
+Every size is measured on the bundled test mazes of that size and on a
+generated maze. Peak memory is measured with tracemalloc where available,
+in a separate run from the timed one, and the simulation record also holds
+the seconds spent in every phase.
+'''
+from maze import Maze
+from mapper import Mapper
+from planner import Planner, get_move_table
+from robot import Robot
+from simulator import Simulator
+from profiler import Profiler
+import mazegen
+from timeit import default_timer
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+sizes = [12, 16, 32, 64]
+bundled_mazes = ['test_maze_01.txt', 'test_maze_02.txt', 'test_maze_03.txt', 'test_maze_04.txt']
+
+# cardinal point looked at by each direction of Maze.dist_to_wall
+sensed_cardinals = {'w': 'l', 'n': 'u', 'e': 'r', 's': 'd'}
+
+
+def sensor_readings(maze):
+    # location and aligned sensor distances for every cell of the maze
+    for x in range(maze.dim):
+        for y in range(maze.dim):
+            yield [x, y], dict((c, maze.dist_to_wall([x, y], d)) for c, d in sensed_cardinals.items())
+
+
+def measure(name, function, calls=1, setup=None):
+    '''
+    Runs function and returns a record of its wall-clock time, the time per
+    call for functions that loop over several calls, and the peak memory
+    allocated while it ran. The memory is taken from a second run, so that
+    tracing allocations does not slow down the timed one. With setup, each
+    run gets a fresh result of setup() as its argument, made outside the
+    measurements.
+    '''
+    args = (setup(),) if setup else ()
+    start = default_timer()
+    function(*args)
+    seconds = default_timer() - start
+    peak = None
+    if tracemalloc:
+        args = (setup(),) if setup else ()
+        tracemalloc.start()
+        function(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {'bench': name, 'seconds': seconds, 'calls': calls,
+            'per_call': seconds / calls, 'peak_bytes': peak}
+
+
+def benchmark_maze(filename):
+    records = []
+    maze = Maze(filename)
+    dim = maze.dim
+
+    records.append(measure('maze_load', lambda: Maze(filename)))
+
+    cells = [[x, y] for x in range(dim) for y in range(dim)]
+    records.append(measure('dist_to_wall', lambda: [maze.dist_to_wall(c, d) for c in cells for d in 'urdl'],
+                           calls=4 * len(cells)))
+
+    # construction of the neighbour table and predecessor tree of a mapper,
+    # and of a planner apart from its move table, which is shared by all
+    # planners of the dimension and built first
+    records.append(measure('mapper_init', lambda: Mapper(dim)))
+    get_move_table(dim)
+    records.append(measure('planner_init', lambda: Planner(dim, seed=0)))
+
+    readings = list(sensor_readings(maze))
+    records.append(measure('mapper_update', lambda mapper: [mapper.update(l, s) for l, s in readings],
+                           calls=len(readings), setup=lambda: Mapper(dim)))
+    mapper = Mapper(dim)
+    for loc, sensors in readings:
+        mapper.update(loc, sensors)
+    records.append(measure('build_tree_rep', mapper.build_tree_rep))
+
+    planner = Planner(dim, seed=0)
+    for loc, sensors in readings:
+        planner.maps.update(loc, sensors)
+    records.append(measure('planner_reset', planner.reset))
+
+    simulator = Simulator(maze, lambda d: Robot(d, seed=0))
+    records.append(measure('simulation', simulator.run))
+
+    # time per phase from a second, instrumented run of the same simulation
+    with Profiler() as profiler:
+        simulator.run()
+    records[-1]['phases'] = profiler.phase_totals()
+
+    for record in records:
+        record['maze'] = os.path.basename(filename)
+        record['dim'] = dim
+    return records
+
+
+def run_benchmarks(sizes=sizes, log=None):
+    records = []
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        for dim in sizes:
+            filenames = [m for m in bundled_mazes if Maze(m).dim == dim]
+            generated = os.path.join(tmp_dir, 'generated_{:02d}.txt'.format(dim))
+            mazegen.write_maze(mazegen.generate(dim, seed=0), generated)
+            for filename in filenames + [generated]:
+                for record in benchmark_maze(filename):
+                    records.append(record)
+                    if log:
+                        log(record)
+    finally:
+        shutil.rmtree(tmp_dir)
+    return records
+
+
+def print_record(record):
+    peak = '{:10.1f} KB'.format(record['peak_bytes'] / 1024.) if record['peak_bytes'] is not None else ''
+    print('{:>3} {:22} {:16} {:10.6f} s {:12.3f} us/call{}'.format(
+        record['dim'], record['maze'], record['bench'], record['seconds'], 1e6 * record['per_call'], peak))
+
+
+if __name__ == '__main__':
+    out_path = sys.argv[1] if len(sys.argv) > 1 else 'stats/benchmark.json'
+    chosen_sizes = [int(s) for s in sys.argv[2:]] or sizes
+
+    results = run_benchmarks(chosen_sizes, log=print_record)
+    with open(out_path, 'w') as f_out:
+        json.dump(results, f_out, indent=1)
@@ -0,0 +1,227 @@
+'''
+Robot controllers that decide the moves of many simulated robots at once,
+either in this process or in a controller process behind a socket, e.g.
+
+    controller = RemoteController(functools.partial(Robot, seed=0))
+    results = BatchSimulator(mazes, controller=controller).run()
+    controller.close()
+
+Robots are addressed by slot numbers. The protocol between the simulator
+and a controller process is a stream of framed binary messages: a header
+of message kind and record count, followed by that many fixed-width
+records of the kind's numpy dtype.
+
+    NEW    (slot, dim) records: create a robot for a maze of size dim
+    STEP   (slot, sensors) records: the controller answers with one
+    MOVES  (slot, rotation, movement, reset) record per robot, in order
+    ERROR  a utf-8 message instead of MOVES if a robot raised an exception
+    CLOSE  no records: the controller process ends
+
+NEW needs no answer, and a single STEP carries the sensors of every robot
+of a batch, so a lockstep of any number of simulations is one round trip.
+A controller under test can run as its own program, see serve_socket.
+'''
+import multiprocessing
+import numpy as np
+import os
+import socket
+import struct
+import sys
+import traceback
+
+msg_new, msg_step, msg_moves, msg_error, msg_close = 1, 2, 3, 4, 5
+header = struct.Struct('<BI')  # message kind, number of records
+
+new_dtype = np.dtype([('slot', '<u4'), ('dim', '<u2')])
+step_dtype = np.dtype([('slot', '<u4'), ('sensors', 'u1', 3)])
+move_dtype = np.dtype([('slot', '<u4'), ('rotation', '<i2'), ('movement', 'i1'), ('reset', 'u1')])
+record_dtypes = {msg_new: new_dtype, msg_step: step_dtype, msg_moves: move_dtype,
+                 msg_error: np.dtype('u1'), msg_close: np.dtype('u1')}
+
+
+def send_message(sock, kind, records=None):
+    payload = b'' if records is None else np.ascontiguousarray(records).tobytes()
+    count = 0 if records is None else len(records)
+    sock.sendall(header.pack(kind, count) + payload)
+
+
+def receive_exactly(sock, size):
+    data = bytearray(size)
+    view, received = memoryview(data), 0
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if not n:
+            raise EOFError('Controller connection closed!')
+        received += n
+    return data
+
+
+def receive_message(sock):
+    # returns the kind and the records of the next message
+    kind, count = header.unpack(bytes(receive_exactly(sock, header.size)))
+    dtype = record_dtypes[kind]
+    return kind, np.frombuffer(receive_exactly(sock, count * dtype.itemsize), dtype=dtype)
+
+
+def encode_moves(slots, moves):
+    records = np.zeros(len(moves), dtype=move_dtype)
+    records['slot'] = slots
+    for k, (rotation, movement) in enumerate(moves):
+        if rotation == 'Reset' and movement == 'Reset':
+            records['reset'][k] = 1
+        else:
+            records['rotation'][k], records['movement'][k] = rotation, movement
+    return records
+
+
+def decode_moves(records):
+    return [('Reset', 'Reset') if reset else (rotation, movement)
+            for slot, rotation, movement, reset in records.tolist()]
+
+
+class LocalController(object):
+    '''
+    Controller running the robots made by robot_factory in this process.
+    '''
+    def __init__(self, robot_factory):
+        self.robot_factory = robot_factory
+        self.robots = dict()
+
+    def new(self, slots, dims):
+        for slot, dim in zip(slots, dims):
+            self.robots[slot] = self.robot_factory(dim)
+
+    def next_moves(self, slots, sensors):
+        # (rotation, movement) of every robot given its three sensor readings
+        return [self.robots[slot].next_move(s) for slot, s in zip(slots, sensors)]
+
+    def close(self):
+        self.robots = dict()
+
+    def robot(self, dim):
+        # stand-in robot for Simulator, taking the next free slot
+        slot = len(self.robots)
+        self.new([slot], [dim])
+        return ControlledRobot(self, slot)
+
+
+class RemoteController(object):
+    '''
+    Controller whose robots live in another process, connected through a
+    socket. Without a socket, a controller process is started with the
+    robots made by robot_factory, which has to be picklable, e.g.
+    functools.partial(Robot, seed=0).
+    '''
+    def __init__(self, robot_factory=None, sock=None):
+        self.slots = 0
+        self.process = None
+        if sock is None:
+            sock, remote = socket.socketpair()
+            self.process = multiprocessing.Process(target=serve, args=(remote, robot_factory))
+            self.process.daemon = True
+            self.process.start()
+            remote.close()
+        self.sock = sock
+
+    @classmethod
+    def connect(cls, path):
+        # controller serving on the Unix socket path, see serve_socket
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(path)
+        return cls(sock=sock)
+
+    def new(self, slots, dims):
+        records = np.zeros(len(slots), dtype=new_dtype)
+        records['slot'], records['dim'] = slots, dims
+        send_message(self.sock, msg_new, records)
+        self.slots = max([self.slots] + [s + 1 for s in slots])
+
+    def send_sensors(self, slots, sensors):
+        records = np.zeros(len(slots), dtype=step_dtype)
+        records['slot'], records['sensors'] = slots, sensors
+        send_message(self.sock, msg_step, records)
+
+    def receive_moves(self):
+        kind, records = receive_message(self.sock)
+        if kind == msg_error:
+            raise Exception('Controller failed:\n' + records.tobytes().decode('utf-8'))
+        return decode_moves(records)
+
+    def next_moves(self, slots, sensors):
+        self.send_sensors(slots, sensors)
+        return self.receive_moves()
+
+    def close(self):
+        try:
+            send_message(self.sock, msg_close)
+        except socket.error:
+            pass
+        self.sock.close()
+        if self.process:
+            self.process.join()
+
+    def robot(self, dim):
+        slot = self.slots
+        self.new([slot], [dim])
+        return ControlledRobot(self, slot)
+
+
+class ControlledRobot(object):
+    # Robot-like view of one controller slot, for Simulator
+    def __init__(self, controller, slot):
+        self.controller = controller
+        self.slot = slot
+
+    def next_move(self, sensors):
+        return self.controller.next_moves([self.slot], [sensors])[0]
+
+
+def serve(sock, robot_factory):
+    # answers the messages of a simulator until it closes the connection
+    controller = LocalController(robot_factory)
+    try:
+        while True:
+            try:
+                kind, records = receive_message(sock)
+            except EOFError:
+                return
+            if kind == msg_close:
+                return
+            if kind == msg_new:
+                controller.new(records['slot'].tolist(), records['dim'].tolist())
+            elif kind == msg_step:
+                slots = records['slot'].tolist()
+                try:
+                    moves = encode_moves(slots, controller.next_moves(slots, records['sensors'].tolist()))
+                except Exception:
+                    message = np.frombuffer(traceback.format_exc().encode('utf-8'), dtype='u1')
+                    send_message(sock, msg_error, message)
+                    continue
+                send_message(sock, msg_moves, moves)
+    finally:
+        sock.close()
+
+
+def serve_socket(path, robot_factory):
+    # serves a single simulator connecting to the Unix socket path
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(1)
+    try:
+        sock, _ = server.accept()
+        serve(sock, robot_factory)
+    finally:
+        server.close()
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    '''
+    Runs the robot of robot.py as a controller on a Unix socket, e.g.
+        python controller.py /tmp/robot.sock [seed] [strategy]
+    '''
+    from robot import Robot
+    path = sys.argv[1]
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    strategy = sys.argv[3] if len(sys.argv) > 3 else 'reward'
+    serve_socket(path, lambda dim: Robot(dim, seed=seed, strategy=strategy))
@@ -0,0 +1,154 @@
+'''
+Packed collections of validated mazes, e.g.
+
+    python corpus.py stats/corpus test_maze_01.txt test_maze_02.txt ...
+
+converts maze files into the corpus directory stats/corpus. A corpus holds
+the walls of all mazes in one contiguous uint8 array, their ray tables in
+another, an index of (offset, dim) per maze and the maze names:
+
+    walls.npy   walls of every maze, flattened [x, y] and concatenated
+    rays.npy    ray tables of every maze, flattened [x, y, direction]
+    index.npy   offset of every maze in walls (4 times that in rays) and dim
+    names.json  name of every maze, e.g. its file name
+
+Loaded corpora memory-map the arrays read-only, so all processes reading a
+corpus share the same pages, and every maze is a Maze built from views
+without parsing, validating or copying. A corpus can also be put into
+shared memory for worker processes that should not touch the files.
+'''
+from maze import Maze
+import json
+import numpy as np
+import os
+import sys
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Python < 3.8
+    shared_memory = None
+
+index_dtype = np.dtype([('offset', '<u8'), ('dim', '<u2')])
+
+
+class MazeCorpus(object):
+    def __init__(self, walls, rays, index, names):
+        self.walls = walls
+        self.rays = rays
+        self.index = index
+        self.names = names
+        self.positions = dict((name, k) for k, name in enumerate(names))
+        self.blocks = []  # shared memory the arrays live in, if any
+
+    @classmethod
+    def load(cls, path):
+        # memory-mapped, read-only corpus from the directory path
+        with open(os.path.join(path, 'names.json')) as f_in:
+            names = json.load(f_in)
+        return cls(np.load(os.path.join(path, 'walls.npy'), mmap_mode='r'),
+                   np.load(os.path.join(path, 'rays.npy'), mmap_mode='r'),
+                   np.load(os.path.join(path, 'index.npy')), names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.positions
+
+    def maze(self, key):
+        # Maze view of the maze with the given name or position
+        k = self.positions[key] if key in self.positions else key
+        offset, dim = int(self.index['offset'][k]), int(self.index['dim'][k])
+        walls = self.walls[offset:offset + dim * dim].reshape(dim, dim)
+        ray = self.rays[4 * offset:4 * (offset + dim * dim)].reshape(dim, dim, 4)
+        return Maze.from_walls(walls, ray)
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self.maze(k)
+
+    def share(self):
+        '''
+        Copies the walls and rays into shared memory and returns a picklable
+        handle, from which other processes attach the corpus without copies
+        by MazeCorpus.attach. The caller owns the shared memory: call close
+        and unlink on the returned corpus when no process needs it any more.
+        '''
+        blocks, arrays = [], []
+        handle = {'index': np.asarray(self.index), 'names': self.names}
+        for name in ('walls', 'rays'):
+            array = getattr(self, name)
+            block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+            shared = np.ndarray(array.shape, dtype=np.uint8, buffer=block.buf)
+            shared[:] = array
+            shared.flags.writeable = False
+            blocks.append(block)
+            arrays.append(shared)
+            handle[name] = (block.name, array.shape)
+        corpus = MazeCorpus(arrays[0], arrays[1], handle['index'], handle['names'])
+        corpus.blocks = blocks
+        return corpus, handle
+
+    @classmethod
+    def attach(cls, handle):
+        # read-only corpus in the shared memory of MazeCorpus.share
+        blocks, arrays = [], []
+        for name in ('walls', 'rays'):
+            block_name, shape = handle[name]
+            block = attach_block(block_name)
+            array = np.ndarray(shape, dtype=np.uint8, buffer=block.buf)
+            array.flags.writeable = False
+            blocks.append(block)
+            arrays.append(array)
+        corpus = cls(arrays[0], arrays[1], handle['index'], handle['names'])
+        corpus.blocks = blocks
+        return corpus
+
+    def close(self):
+        # detach from the shared memory, if any; views of it must be gone
+        self.walls = self.rays = None
+        for block in self.blocks:
+            block.close()
+
+    def unlink(self):
+        for block in self.blocks:
+            block.unlink()
+
+
+def attach_block(name):
+    # attached shared memory is owned by its creator, so it is not tracked
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13, tracked by the creator's resource tracker
+        return shared_memory.SharedMemory(name=name)
+
+
+def write_corpus(path, mazes, names):
+    '''
+    Writes a corpus of the given wall arrays, indexed like Maze.walls, or
+    Maze objects to the directory path. Walls are validated like a maze
+    file before they are written.
+    '''
+    mazes = [m if isinstance(m, Maze) else Maze.from_walls(m) for m in mazes]
+    index = np.zeros(len(mazes), dtype=index_dtype)
+    index['dim'] = [m.dim for m in mazes]
+    index['offset'][1:] = np.cumsum(index['dim'].astype(np.uint64) ** 2)[:-1]
+
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    walls = np.concatenate([m.walls.ravel() for m in mazes]) if mazes else np.zeros(0, np.uint8)
+    rays = np.concatenate([m.ray.ravel() for m in mazes]) if mazes else np.zeros(0, np.uint8)
+    np.save(os.path.join(path, 'walls.npy'), walls.astype(np.uint8))
+    np.save(os.path.join(path, 'rays.npy'), rays.astype(np.uint8))
+    np.save(os.path.join(path, 'index.npy'), index)
+    with open(os.path.join(path, 'names.json'), 'w') as f_out:
+        json.dump(list(names), f_out)
+
+
+def convert(filenames, path):
+    # corpus of maze text files, named by the file names as given
+    write_corpus(path, [Maze(f) for f in filenames], filenames)
+
+
+if __name__ == '__main__':
+    convert(sys.argv[2:], sys.argv[1])
@@ -0,0 +1,26 @@
+from mapper import format_map
+from time import sleep
+
+
+class ConsoleSink(object):
+    '''
+    Prints the events of a Planner to the console. Step lines, the map of
+    the known walls and the pause after every step can each be turned off;
+    the end of the training run is always reported.
+    '''
+    def __init__(self, steps=True, show_map=True, delay=0.05):
+        self.steps = steps
+        self.show_map = show_map
+        self.delay = delay
+
+    def __call__(self, event):
+        if event['event'] == 'reset':
+            print('Finished at step {} found with path length {}'.format(
+                event['t'], event['path_length']))
+        elif event['event'] == 'step' and self.steps:
+            print('\n## Step {} ## {} %'.format(event['t'], int(event['coverage'])))
+            if self.delay:
+                sleep(self.delay)
+            if self.show_map:
+                print(format_map(event['walls'], event['loc'], event['heading']))
+            print('rot {} mov {}'.format(event['rotation'], event['movement']))
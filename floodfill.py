@@ -0,0 +1,52 @@
+from mapper import cardinal_points, offsets, opposite, wall_bits
+
+
+class FloodField(object):
+    '''
+    Distance, in single cell moves, from every cell to the nearest target
+    cell. Walls that have not been seen yet are assumed to be open, so the
+    distances can only grow as the mapper finds closed walls, and the field
+    is repaired locally around each newly closed wall instead of refilled.
+    '''
+    def __init__(self, dim, targets):
+        self.dim = dim
+        self.targets = set(targets)
+        self.unreachable = self.dim ** 2  # no path can be longer than this
+
+        # wall bits of every index that are not known to be closed
+        self.open_sides = [15] * self.dim ** 2
+
+        # before any wall is known the distance is the manhattan distance
+        self.dist = [min(abs(x - t % self.dim) + abs(y - t // self.dim) for t in self.targets)
+                     for y in range(self.dim) for x in range(self.dim)]
+
+    def open_neighbours(self, idx):
+        x, y = idx % self.dim, idx // self.dim
+        sides = self.open_sides[idx]
+        for cardinal in cardinal_points:
+            x2, y2 = x + offsets[cardinal][0], y + offsets[cardinal][1]
+            if sides & wall_bits[cardinal] and 0 <= x2 < self.dim and 0 <= y2 < self.dim:
+                yield x2 + y2*self.dim
+
+    def close_walls(self, closed_walls):
+        # re-evaluate the cells on both sides of every (idx, cardinal) wall and
+        # spread any change to their neighbours until the field is consistent
+        dist = self.dist
+        stack = []
+        for idx, cardinal in closed_walls:
+            x, y = idx % self.dim + offsets[cardinal][0], idx // self.dim + offsets[cardinal][1]
+            self.open_sides[idx] &= ~wall_bits[cardinal]
+            stack.append(idx)
+            if 0 <= x < self.dim and 0 <= y < self.dim:
+                self.open_sides[x + y*self.dim] &= ~wall_bits[opposite[cardinal]]
+                stack.append(x + y*self.dim)
+
+        while stack:
+            idx = stack.pop()
+            if idx in self.targets:
+                continue
+            neighbours = list(self.open_neighbours(idx))
+            best = min([dist[n] + 1 for n in neighbours] + [self.unreachable])
+            if best != dist[idx]:
+                dist[idx] = best
+                stack.extend(neighbours)
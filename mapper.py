@@ -1,5 +1,5 @@
 import numpy as np
-from itertools import permutations
+from collections import deque
 
 #
 #  key for maze decryption
@@ -19,25 +19,111 @@ from itertools import permutations
 #  |0 |1 |2 |3 |4 |5  ... 10|11|
 #   -- -- -- -- -- --     -- --
 
-closed = {'w': [0, 1, 2, 3, 4, 5, 6, 7],
-          's': [0, 1, 2, 3, 8, 9, 10, 11], 
-          'e': [0, 1, 4, 5, 8, 9, 12, 13], 
-          'n': [0, 2, 4, 6, 8, 10, 12, 14]}
+cardinal_points = ['w', 'n', 'e', 's']
+limit = 3  # maximum number of steps the robot can take
+
+# wall bit, grid offset and opposite side of every cardinal point
+wall_bits = {'w': 8, 'n': 1, 'e': 2, 's': 4}
+offsets = {'w': (-1, 0), 'n': (0, 1), 'e': (1, 0), 's': (0, -1)}
+opposite = {'w': 'e', 'n': 's', 'e': 'w', 's': 'n'}
+
+no_move = np.iinfo(np.uint16).max  # empty slot of the neighbour table
+unreachable = 10000  # distance marker for indices not (yet) connected to the source
+
+
+class ShortestPaths(object):
+    # breadth-first shortest path tree over the sparse move graph, rooted at a
+    # single source index. Moves are only ever added to the graph, so distances
+    # can only shrink and the tree is repaired by relaxing from the new edges.
+    def __init__(self, neighbours, source=0):
+        size = len(neighbours)
+        self.source = source
+        self.neighbours = neighbours
+        self.dist = [unreachable] * size
+        self.pred = [-unreachable] * size
+        self.dist[source], self.pred[source] = 0, source
+
+    def relax(self, i, j):
+        if self.dist[i] + 1 >= self.dist[j]:
+            return
+        dist, pred, neighbours = self.dist, self.pred, self.neighbours
+        dist[j], pred[j] = dist[i] + 1, i
+
+        queue = deque([j])
+        while queue:
+            k = queue.popleft()
+            for n in neighbours[k].ravel().tolist():
+                if n != no_move and dist[k] + 1 < dist[n]:
+                    dist[n], pred[n] = dist[k] + 1, k
+                    queue.append(n)
+
+    def rebuild(self):
+        # recompute the whole tree from the current graph, e.g. after the
+        # neighbour table was filled in one go
+        size = len(self.neighbours)
+        self.dist[:], self.pred[:] = [unreachable] * size, [-unreachable] * size
+        self.dist[self.source], self.pred[self.source] = 0, self.source
+        for n in self.neighbours[self.source].ravel().tolist():
+            if n != no_move:
+                self.relax(self.source, n)
+
+    def is_reachable(self, idx):
+        return self.dist[idx] < unreachable
+
+
+robot_markers = {'w': '<', 'n': '^', 'e': '>', 's': 'v'}
+
+
+def frame_chars(walls, loc, heading):
+    '''
+    Returns the ascii picture of the known walls with the robot at loc as a
+    2d array of characters, top line first: the top walls, one line per row
+    of cells with its number and the column numbers at the bottom. Only the
+    left and bottom wall of every cell is drawn, so the robot cannot be
+    shown underlined by a bottom wall.
+    '''
+    dim = len(walls)
+    rows = walls[:, ::-1].T  # wall codes by line, top row first
+
+    frame = np.full((dim + 2, 2*dim + 6), ' ', dtype='U1')
+    frame[0, 4:2*dim + 4:2] = '_'
+    frame[1:-1, 3:2*dim + 3:2] = np.where(rows & wall_bits['w'], ' ', '|')
+    frame[1:-1, 4:2*dim + 4:2] = np.where(rows & wall_bits['s'], ' ', '_')
+    frame[1:-1, 2*dim + 3] = '|'
+
+    for line in range(dim + 1):
+        frame[line, :2] = list('{:02d}'.format((dim - line) % 100))
+    frame[-1, 4::2] = [str(x % 10) for x in range(dim + 1)]
+
+    frame[dim - loc[1], 4 + 2*loc[0]] = robot_markers[heading]
+    return frame
+
+
+def format_map(walls, loc, heading):
+    # ascii picture of the known walls with the robot at loc
+    frame = frame_chars(walls, loc, heading)
+    return '\n' + '\n'.join(''.join(line) for line in frame) + '\n'
 
 
 class Mapper(object):
     def __init__(self, dim):
+        if dim ** 2 >= no_move:
+            raise Exception('Maze dimension {} is too large for the neighbour table!'.format(dim))
         self.dim = dim
-        self.walls = np.zeros(shape=(self.dim, self.dim), dtype=int)  # walls of maze
+        self.walls = np.zeros(shape=(self.dim, self.dim), dtype=np.uint8)  # walls of maze
+        self.known = np.zeros(shape=(self.dim, self.dim), dtype=np.uint8)  # walls seen open or closed
         self.visited = set()  # set of visited indices
 
-        self.A1 = np.zeros(shape=(self.dim ** 2, self.dim ** 2), dtype=int)  # adjacency matrix
-        self.tree = np.zeros(shape=(self.dim ** 2, self.dim ** 2), dtype=int)  # adjacency tree
+        # known moves as a neighbour table: the slot [idx, cardinal, steps - 1]
+        # holds the index reached from idx, or no_move if it is not known
+        self.A1 = np.full((self.dim ** 2, len(cardinal_points), limit), no_move, dtype=np.uint16)
+        self.tree = np.full(self.dim ** 2, -unreachable, dtype=np.int32)  # predecessors from the origin
+        self.paths = ShortestPaths(self.A1)  # shortest paths from the origin
 
         self.R = self.setup_reward_grid()  # reward grid
 
     def setup_reward_grid(self):
-        r = self.dim / 2
+        r = self.dim // 2
         grid = np.full((self.dim, self.dim), -r)
         for c, x in enumerate(range(r - 1, 0, -1)):
             sub = np.full((x * 2, x * 2), -x)
@@ -47,117 +133,88 @@ class Mapper(object):
         return grid
 
     def update(self, loc, sensors):
-        # given aligned sensors
+        # given aligned sensors, returns the (idx, cardinal) walls newly seen closed
         this_idx = loc[0] + loc[1]*self.dim
         self.visited.add(this_idx)
-        
-        adj_idx = []
-        limit = 3  # maximum number of steps the robot can take
-
-        # facing north
-        for i in range(sensors['n']):
-            x1, y1, x2, y2 = loc[0], loc[1] + i, loc[0], loc[1] + i + 1
-
-            if self.walls[x1, y1] in closed['n']:
-                self.walls[x1, y1] += 1  # opens top of this field
-                self.walls[x1, y2] += 4  # opens bottom of next field
-                
-                mult = np.clip(sensors['n'] - i, 0, limit)
-                idx = [x1 + (y1 + y)*self.dim for y in range(mult + 1)]
-                adj_idx += list(permutations(idx, 2))
-
-        # facing east
-        for i in range(sensors['e']):
-            x1, y1, x2, y2 = loc[0] + i, loc[1], loc[0] + i + 1, loc[1]
-            if self.walls[x1, y1] in closed['e']:
-                self.walls[x1, y1] += 2  # opens right of this field
-                self.walls[x2, y2] += 8  # opens left of next field
-
-                mult = np.clip(sensors['e'] - i, 0, limit)
-                idx = [x1 + x + y1*self.dim for x in range(mult + 1)]
-                adj_idx += list(permutations(idx, 2))
-
-        # facing south
-        for i in range(sensors['s']):
-            x1, y1, x2, y2 = loc[0], loc[1] - i, loc[0], loc[1] - i - 1
-            if self.walls[x1, y1] in closed['s']:
-                self.walls[x1, y1] += 4  # opens bottom of this field
-                self.walls[x2, y2] += 1  # opens top of next field
-                
-                mult = np.clip(sensors['s'] - i, 0, limit)
-                idx = [x1 + (y1 - y)*self.dim for y in range(mult + 1)]
-                adj_idx += list(permutations(idx, 2))
-
-        # facing west
-        for i in range(sensors['w']):
-            x1, y1, x2, y2 = loc[0] - i, loc[1], loc[0] - i - 1, loc[1]
-            if self.walls[x1, y1] in closed['w']:
-                self.walls[x1, y1] += 8  # opens left of this field
-                self.walls[x2, y2] += 2  # opens right of next field
-                
-                mult = np.clip(sensors['w'] - i, 0, limit)
-                idx = [x1 - x + y1*self.dim for x in range(mult + 1)]
-                adj_idx += list(permutations(idx, 2))
-
-        for (x, y) in adj_idx:
-            self.A1[x, y] = 1
+
+        closed_walls = []
+        for cardinal, distance in sensors.items():
+            # cells along the sensed ray, from this field to the closed wall
+            ray = np.arange(distance + 1)
+            xs = loc[0] + offsets[cardinal][0] * ray
+            ys = loc[1] + offsets[cardinal][1] * ray
+
+            if distance:
+                # open the passages between them from both sides; or-ing the bits
+                # keeps walls that were already opened from another field intact
+                self.walls[xs[:-1], ys[:-1]] |= wall_bits[cardinal]
+                self.walls[xs[1:], ys[1:]] |= wall_bits[opposite[cardinal]]
+                self.add_moves(xs + ys*self.dim, cardinal)
+
+            # every sensed ray ends at a closed wall
+            if self.close_wall(xs[-1], ys[-1], cardinal):
+                closed_walls.append((int(xs[-1] + ys[-1]*self.dim), cardinal))
+        self.known |= self.walls
+
+        return closed_walls
+
+    def add_moves(self, indices, cardinal):
+        # store all moves of up to limit steps between the indices of an open
+        # straight line, in both directions, and relax the paths over new ones
+        forward, backward = cardinal_points.index(cardinal), cardinal_points.index(opposite[cardinal])
+        for steps in range(1, min(limit, len(indices) - 1) + 1):
+            i, j = indices[:-steps], indices[steps:]
+            new_forward = self.A1[i, forward, steps - 1] == no_move
+            new_backward = self.A1[j, backward, steps - 1] == no_move
+            self.A1[i, forward, steps - 1] = j
+            self.A1[j, backward, steps - 1] = i
+
+            for a, b in zip(i[new_forward].tolist(), j[new_forward].tolist()):
+                self.paths.relax(a, b)
+            for a, b in zip(j[new_backward].tolist(), i[new_backward].tolist()):
+                self.paths.relax(a, b)
+
+    def close_wall(self, x, y, cardinal):
+        # mark a wall as seen closed on both of its sides, true if it was unknown
+        if self.known[x, y] & wall_bits[cardinal]:
+            return False
+        self.known[x, y] |= wall_bits[cardinal]
+
+        x2, y2 = x + offsets[cardinal][0], y + offsets[cardinal][1]
+        if 0 <= x2 < self.dim and 0 <= y2 < self.dim:
+            self.known[x2, y2] |= wall_bits[opposite[cardinal]]
+        return True
+
+    def optimistic_walls(self):
+        # walls with every wall not seen yet assumed open, apart from the outer walls
+        walls = self.walls | (~self.known & 15)
+        walls[:, -1] &= 15 ^ wall_bits['n']
+        walls[-1, :] &= 15 ^ wall_bits['e']
+        walls[:, 0] &= 15 ^ wall_bits['s']
+        walls[0, :] &= 15 ^ wall_bits['w']
+        return walls
+
+    def get_adj_indices(self, idx):
+        # all indices known to be reachable from idx in a single move
+        moves = self.A1[idx].ravel()
+        return moves[moves != no_move].tolist()
+
+    def has_moves(self, idx):
+        return bool((self.A1[idx] != no_move).any())
 
     def percentage_of_map_visited(self):
         return 100/(self.dim**2.0)*len(self.visited)
 
     def build_tree_rep(self):
-        adj, dim2 = self.A1, self.dim ** 2
-        tree = np.zeros(adj.shape)
-        for i in range(dim2):
-            for j in range(dim2):
-                tree[i, j] = i
-                if i != j and adj[i, j] == 0:
-                    tree[i, j] = -10000 
-                    adj[i, j] = 10000
-
-        for k in range(dim2):
-            for i in range(dim2):
-                for j in range(dim2):
-                    if adj[i, j] > adj[i, k] + adj[k, j]:
-                        adj[i, j] = adj[i, k] + adj[k, j]
-                        tree[i, j] = tree[k, j]
-        self.tree = tree
+        # snapshot the predecessors of the incremental shortest path tree
+        self.tree[:] = self.paths.pred
 
     def get_reward_from_idx(self, idx):
         x, y = self.idx_to_loc(idx)
         return self.R[x, y]
 
     def idx_to_loc(self, idx):
-        return idx % self.dim, int(idx/self.dim)
+        return idx % self.dim, idx // self.dim
 
     def pretty_print_map(self, loc, heading):
-        dim = self.dim
-        v, h, o, n = '|', '_', ' ', '\n'
-
-        # note: cannot print the bottom wall for current field since underlined 'v' not possible
-        robot_heading = {'w': '<', 'n': '^', 'e': '>', 's': 'v'}
-
-        x_dim, y_dim = dim * 2 + 3, dim + 1
-
-        top_row = [o] + list([h, o]) * dim + [o] + [n]
-        grid = [top_row]
-
-        for y in range(0, dim):
-            wall = self.walls[:, -y-1]
-            row = [' ']*x_dim
-            for x, bit in enumerate(wall):
-                row[x*2] = v if bit in closed['w'] else o
-                row[x*2 + 1] = h if bit in closed['s'] else o  
-            row[-3], row[-1] = v, n
-            grid.append(row)
-
-        grid[y_dim - loc[1] - 1][loc[0]*2 + 1] = robot_heading[heading]
-
-        g_dim = len(grid)
-        print_grid = '\n'
-        for idx, line in enumerate(grid):
-            print_grid += str(g_dim - idx - 1).zfill(2) + ' ' + ''.join(line)
-
-        coordinates = [str(x % 10) + ' ' for x in range(g_dim)]
-        print_grid += '    ' + ''.join(coordinates) + '\n'
-        print print_grid
+        print(format_map(self.walls, loc, heading))
@@ -1,5 +1,34 @@
 import numpy as np
 
+# bit of each direction in the wall code, and its column in the ray table
+dir_int = {'u': 1, 'r': 2, 'd': 4, 'l': 8,
+           'up': 1, 'right': 2, 'down': 4, 'left': 8}
+dir_ray = {'u': 0, 'r': 1, 'd': 2, 'l': 3,
+           'up': 0, 'right': 1, 'down': 2, 'left': 3}
+
+
+def open_run_lengths(is_open, axis):
+    # number of consecutive open cells ending at each position along axis
+    count = np.cumsum(is_open, axis=axis)
+    at_wall = np.where(is_open, 0, count)
+    return count - np.maximum.accumulate(at_wall, axis=axis)
+
+
+def build_ray_table(walls):
+    '''
+    Returns a (dim, dim, 4) table with the number of open cells between each
+    cell and the nearest wall, looking up, right, down and left.
+    '''
+    is_open = (walls[:, :, None] >> np.arange(4)) & 1
+    ray = np.zeros(is_open.shape, dtype=np.uint8)
+    # up and right are counted from the far edge of the maze
+    ray[:, ::-1, 0] = open_run_lengths(is_open[:, ::-1, 0], axis=1)
+    ray[::-1, :, 1] = open_run_lengths(is_open[::-1, :, 1], axis=0)
+    ray[:, :, 2] = open_run_lengths(is_open[:, :, 2], axis=1)
+    ray[:, :, 3] = open_run_lengths(is_open[:, :, 3], axis=0)
+    return ray
+
+
 class Maze(object):
     def __init__(self, filename):
         '''
@@ -10,21 +39,41 @@ class Maze(object):
             corresponds with a square's top edge, 2s register the right edge,
             4s register the bottom edge, and 8s register the left edge. (numpy
             array)
+        - ray: distance to the nearest wall from every cell in every direction,
+            precomputed for sensing. (numpy array)
 
         The initialization function also performs some consistency checks for
         wall positioning.
         '''
-        with open(filename, 'rb') as f_in:
+        with open(filename, 'r') as f_in:
 
             # First line should be an integer with the maze dimensions
-            self.dim = int(f_in.next())
+            self.dim = int(f_in.readline())
 
             # Subsequent lines describe the permissability of walls
-            walls = []
-            for line in f_in:
-                walls.append(map(int,line.split(',')))
-            self.walls = np.array(walls)
+            self.walls = np.loadtxt(f_in, delimiter=',', dtype=int, ndmin=2).astype(np.uint8)
 
+        self.validate()
+        self.ray = build_ray_table(self.walls)
+
+    @classmethod
+    def from_walls(cls, walls, ray=None):
+        '''
+        Creates a maze from an in-memory array of wall codes, indexed like the
+        walls attribute, with the same validation as a maze file. Walls that
+        were validated before, e.g. in a corpus, can come with their ray
+        table; the maze then keeps both arrays as they are, without copies.
+        '''
+        maze = cls.__new__(cls)
+        maze.walls = np.asarray(walls, dtype=np.uint8)
+        maze.dim = len(maze.walls)
+        if ray is None:
+            maze.validate()
+            ray = build_ray_table(maze.walls)
+        maze.ray = np.asarray(ray, dtype=np.uint8)
+        return maze
+
+    def validate(self):
         # Perform validation on maze
         # Maze dimensions
         if self.dim % 2:
@@ -32,27 +81,17 @@ class Maze(object):
         if self.walls.shape != (self.dim, self.dim):
             raise Exception('Maze shape does not match dimension attribute!')
 
-        # Wall permeability
-        wall_errors = []
-        # vertical walls
-        for x in range(self.dim-1):
-            for y in range(self.dim):
-                if (self.walls[x,y] & 2 != 0) != (self.walls[x+1,y] & 8 != 0):
-                    wall_errors.append([(x,y), 'v'])
-        # horizontal walls
-        for y in range(self.dim-1):
-            for x in range(self.dim):
-                if (self.walls[x,y] & 1 != 0) != (self.walls[x,y+1] & 4 != 0):
-                    wall_errors.append([(x,y), 'h'])
-
-        if wall_errors:
-            for cell, wall_type in wall_errors:
-                if wall_type == 'v':
-                    cell2 = (cell[0]+1, cell[1])
-                    print 'Inconsistent vertical wall betweeen {} and {}'.format(cell, cell2)
-                else:
-                    cell2 = (cell[0], cell[1]+1)
-                    print 'Inconsistent horizontal wall betweeen {} and {}'.format(cell, cell2)
+        # Wall permeability, compared between each cell and its neighbour
+        # vertical walls: right edge of (x, y) against left edge of (x+1, y)
+        v_errors = (self.walls[:-1, :] & 2 != 0) != (self.walls[1:, :] & 8 != 0)
+        # horizontal walls: top edge of (x, y) against bottom edge of (x, y+1)
+        h_errors = (self.walls[:, :-1] & 1 != 0) != (self.walls[:, 1:] & 4 != 0)
+
+        if v_errors.any() or h_errors.any():
+            for x, y in np.argwhere(v_errors).tolist():
+                print('Inconsistent vertical wall betweeen {} and {}'.format((x, y), (x+1, y)))
+            for y, x in np.argwhere(h_errors.T).tolist():
+                print('Inconsistent horizontal wall betweeen {} and {}'.format((x, y), (x, y+1)))
             raise Exception('Consistency errors found in wall specifications!')
 
 
@@ -63,12 +102,10 @@ class Maze(object):
         input as single letter 'u', 'r', 'd', 'l', or complete words 'up', 
         'right', 'down', 'left'.
         """
-        dir_int = {'u': 1, 'r': 2, 'd': 4, 'l': 8,
-                   'up': 1, 'right': 2, 'down': 4, 'left': 8}
         try:
             return (self.walls[tuple(cell)] & dir_int[direction] != 0)
         except:
-            print 'Invalid direction provided!'
+            print('Invalid direction provided!')
 
 
     def dist_to_wall(self, cell, direction):
@@ -78,17 +115,8 @@ class Maze(object):
         may be input as a single letter 'u', 'r', 'd', 'l', or complete words
         'up', 'right', 'down', 'left'.
         """
-        dir_move = {'u': [0, 1], 'r': [1, 0], 'd': [0, -1], 'l': [-1, 0],
-                    'up': [0, 1], 'right': [1, 0], 'down': [0, -1], 'left': [-1, 0]}
-
-        sensing = True
-        distance = 0
-        curr_cell = list(cell) # make copy to preserve original
-        while sensing:
-            if self.is_permissible(curr_cell, direction):
-                distance += 1
-                curr_cell[0] += dir_move[direction][0]
-                curr_cell[1] += dir_move[direction][1]
-            else:
-                sensing = False
-        return distance
\ No newline at end of file
+        try:
+            return int(self.ray[cell[0], cell[1], dir_ray[direction]])
+        except KeyError:
+            print('Invalid direction provided!')
+            return 0
@@ -0,0 +1,159 @@
+'''
+Generates random mazes in the format of the test mazes, e.g.
+
+    python mazegen.py out_dir count dim [algorithm] [seed]
+
+writes count mazes of dim x dim cells to out_dir/maze_00000.txt and on.
+
+Algorithms: 'backtracker' (recursive backtracker, long winding corridors),
+'kruskal' (randomized Kruskal, many short dead ends) and 'braid' (a
+backtracker maze with its dead ends knocked through, so full of loops).
+Every maze is connected, the start cell is a dead end that opens to the
+north only, and the four goal cells in the centre are open to each other.
+'''
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import os
+import random
+import sys
+
+# wall bit towards each neighbour and the bit of the neighbour facing back
+sides = [(0, 1, 1, 4), (1, 0, 2, 8), (0, -1, 4, 1), (-1, 0, 8, 2)]
+
+# neighbours of every cell index by maze dimension
+_neighbours = dict()
+
+
+def get_neighbours(dim):
+    # (neighbour index, wall bit, bit of the neighbour) for every index x + y*dim
+    if dim not in _neighbours:
+        _neighbours[dim] = [[(x + dx + (y + dy)*dim, bit, back) for dx, dy, bit, back in sides
+                             if 0 <= x + dx < dim and 0 <= y + dy < dim]
+                            for y in range(dim) for x in range(dim)]
+    return _neighbours[dim]
+
+
+def recursive_backtracker(dim, rng):
+    neighbours = get_neighbours(dim)
+    walls = [0] * dim**2
+
+    # the start index 0 is left out and attached as a dead end afterwards
+    seen = [False] * dim**2
+    seen[0] = seen[dim] = True
+    stack = [dim]
+    while stack:
+        idx = stack[-1]
+        options = [n for n in neighbours[idx] if not seen[n[0]]]
+        if not options:
+            stack.pop()
+            continue
+        next_idx, bit, back = options[int(rng.random() * len(options))]
+        walls[idx] |= bit
+        walls[next_idx] |= back
+        seen[next_idx] = True
+        stack.append(next_idx)
+    return walls
+
+
+def kruskal(dim, rng):
+    neighbours = get_neighbours(dim)
+    walls = [0] * dim**2
+
+    # every wall between two cells (apart from the start index 0) in random order
+    edges = [(idx, n, bit, back) for idx in range(1, dim**2)
+             for n, bit, back in neighbours[idx] if n > idx]
+    rng.shuffle(edges)
+
+    parent = list(range(dim**2))
+
+    def root(idx):
+        while parent[idx] != idx:
+            parent[idx] = parent[parent[idx]]
+            idx = parent[idx]
+        return idx
+
+    for idx, n, bit, back in edges:
+        a, b = root(idx), root(n)
+        if a != b:
+            parent[a] = b
+            walls[idx] |= bit
+            walls[n] |= back
+    return walls
+
+
+def braid(dim, rng):
+    # knock one more wall out of every dead end of a backtracker maze
+    neighbours = get_neighbours(dim)
+    walls = recursive_backtracker(dim, rng)
+    for idx in rng.sample(range(1, dim**2), dim**2 - 1):
+        if bin(walls[idx]).count('1') != 1:
+            continue
+        options = [n for n in neighbours[idx] if not walls[idx] & n[1] and n[0] != 0]
+        if options:
+            next_idx, bit, back = options[int(rng.random() * len(options))]
+            walls[idx] |= bit
+            walls[next_idx] |= back
+    return walls
+
+
+algorithms = {'backtracker': recursive_backtracker, 'kruskal': kruskal, 'braid': braid}
+
+
+def generate(dim, algorithm='backtracker', seed=None):
+    '''
+    Returns the wall codes of a random maze as a (dim, dim) uint8 array
+    indexed [x, y] like Maze.walls. dim must be even; the same seed always
+    gives the same maze.
+    '''
+    if dim % 2 or dim < 4:
+        raise Exception('Maze dimensions must be even and at least 4!')
+    rng = seed if isinstance(seed, random.Random) else random.Random(seed)
+    walls = algorithms[algorithm](dim, rng)
+
+    # start index 0 only opens to the north
+    walls[0] |= 1
+    walls[dim] |= 4
+
+    # the four goal cells are open to each other
+    c = dim // 2
+    walls[c - 1 + (c - 1)*dim] |= 1 | 2
+    walls[c + (c - 1)*dim] |= 1 | 8
+    walls[c - 1 + c*dim] |= 4 | 2
+    walls[c + c*dim] |= 4 | 8
+
+    return np.array(walls, dtype=np.uint8).reshape(dim, dim).T.copy()
+
+
+def write_maze(walls, filename):
+    # text format read by Maze: the dimension, then one line of codes per column
+    with open(filename, 'w') as f_out:
+        f_out.write('{}\n'.format(len(walls)))
+        for column in walls:
+            f_out.write(','.join(str(w) for w in column) + '\n')
+
+
+def _generate_chunk(args):
+    dim, algorithm, seeds = args
+    return [generate(dim, algorithm, seed) for seed in seeds]
+
+
+def generate_many(count, dim, algorithm='backtracker', seed=0, workers=None, chunk=250):
+    '''
+    Returns count mazes generated with the seeds seed, seed + 1, ... spread
+    over a pool of worker processes.
+    '''
+    jobs = [(dim, algorithm, range(s, min(s + chunk, seed + count)))
+            for s in range(seed, seed + count, chunk)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return [walls for mazes in executor.map(_generate_chunk, jobs) for walls in mazes]
+
+
+if __name__ == '__main__':
+    out_dir, count, dim = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+    algorithm = sys.argv[4] if len(sys.argv) > 4 else 'backtracker'
+    seed = int(sys.argv[5]) if len(sys.argv) > 5 else 0
+
+    if not os.path.isdir(out_dir):
+        os.makedirs(out_dir)
+    for k, walls in enumerate(generate_many(count, dim, algorithm, seed)):
+        write_maze(walls, os.path.join(out_dir, 'maze_{:05d}.txt'.format(k)))
@@ -1,19 +1,46 @@
 import numpy as np
 import random
-from mapper import Mapper
-from time import sleep
+from collections import deque
+from mapper import Mapper, cardinal_points, offsets, opposite, limit
+from floodfill import FloodField
+from raceplan import plan_race, follow_cells
 
-cardinal_points = ['w', 'n', 'e', 's']
 origin_idx, origin_loc = 0, [0, 0]
-
-verbose = True
-sleep_on_display = 0.05
+headings = {'n': 0, 'e': 1, 's': 2, 'w': 3}  # integer headings of the race planner
+
+# rotation turning from one cardinal point to another, by their position in
+# cardinal_points (which run clockwise); None where the robot would turn around
+rotations = [[{0: 0, 1: 90, 2: None, 3: -90}[(to - at) % 4] for to in range(4)] for at in range(4)]
+
+# move tables, shared by all planners of the same maze dimension
+_move_tables = dict()
+
+
+def get_move_table(dim):
+    '''
+    Returns a read-only (dim**2, 4, 3) table of the index reached from every
+    index by moving 1, 2 or 3 cells towards each of the cardinal_points, or
+    -1 where that move would leave the maze.
+    '''
+    if dim not in _move_tables:
+        idx = np.arange(dim ** 2)
+        steps = np.arange(1, limit + 1)
+        table = np.full((dim ** 2, len(cardinal_points), limit), -1, dtype=np.int32)
+        for c, cardinal in enumerate(cardinal_points):
+            x = (idx % dim)[:, None] + offsets[cardinal][0] * steps
+            y = (idx // dim)[:, None] + offsets[cardinal][1] * steps
+            inside = (x >= 0) & (x < dim) & (y >= 0) & (y < dim)
+            table[:, c, :] = np.where(inside, x + y*dim, -1)
+        table.flags.writeable = False
+        _move_tables[dim] = table
+    return _move_tables[dim]
 
 
 class Planner(object):
-    def __init__(self, dim, params=[]):
+    def __init__(self, dim, params=[], seed=None, sink=None, strategy='reward'):
         self.dim = dim
         self.maps = Mapper(dim)
+        self.moves = get_move_table(dim)
         self.loc = origin_loc
         self.heading = 'n'
 
@@ -23,12 +50,36 @@ class Planner(object):
 
         self.min_percentage = params[0] if params else 40
 
+        # random choices come from an own generator, so that a run can be
+        # replayed from its seed (or a random.Random instance can be shared)
+        self.rng = seed if isinstance(seed, random.Random) else random.Random(seed)
+
         self.goal_indices = self.setup_goal_indices(self.dim)
         self.optimal_steps = []
 
+        # exploration strategy of the training run: 'reward' heads for the
+        # centre through unvisited cells, 'floodfill' follows a flood fill
+        # field to the goal and then the nearest unvisited cells, 'frontier'
+        # explores the walls that could still shorten the race and resets as
+        # soon as the race over the known walls is proven to be the fastest
+        self.strategy = strategy
+        self.explorers = {'reward': self.explore, 'floodfill': self.explore_flood,
+                          'frontier': self.explore_frontier}
+        self.flood = FloodField(self.dim, self.goal_indices) if strategy in ('floodfill', 'frontier') else None
+
+        # race plans over the optimistic and the known walls, the bounds of
+        # the fastest race kept up to date by the frontier strategy
+        self.lower_steps, self.upper_steps = [], None
+        self.frontier = set()
+        self.bounds_known = None  # known walls the bounds were computed for
+
+        # optional callable receiving a dict for every planning event, e.g.
+        # events.ConsoleSink to print the steps and the map
+        self.sink = sink
+
     def setup_goal_indices(self, dim):
         # find indices of four goal locations in the centre of the grid
-        goals = [(dim/2, dim/2), (dim/2, dim/2-1), (dim/2-1, dim/2), (dim/2-1, dim/2-1)]
+        goals = [(dim//2, dim//2), (dim//2, dim//2-1), (dim//2-1, dim//2), (dim//2-1, dim//2-1)]
         return [self.loc_to_idx(*l) for l in goals]
 
     def get_next_move(self, t, sensors):
@@ -36,23 +87,34 @@ class Planner(object):
         aligned_sensors = self.align_sensors_to_cardinal(sensors)
 
         # update the knowledge of the map from sensor info
-        self.maps.update(self.loc, aligned_sensors)
+        closed_walls = self.maps.update(self.loc, aligned_sensors)
+        if self.flood:
+            self.flood.close_walls(closed_walls)
+        if self.strategy == 'frontier' and self.found_goal:
+            self.update_bounds()
         p = self.maps.percentage_of_map_visited()
+        loc, heading = self.loc, self.heading
 
-        if verbose:
-            print '\n## Step', t, '##', int(p), '%'
-            sleep(sleep_on_display)
-            self.maps.pretty_print_map(self.loc, self.heading)
-
-        if p >= self.min_percentage and self.found_goal:
-            print 'Finished at step', t,
+        if self.exploration_done(p):
             self.reset()
             rotation, movement = ('Reset', 'Reset')  # start trial 2
+            if self.sink:
+                self.sink({'event': 'reset', 't': t, 'path_length': len(self.optimal_steps)})
         else:
-            rotation, movement = self.explore()
+            rotation, movement = self.explorers[self.strategy]()
+
+        if self.sink:
+            self.sink({'event': 'step', 't': t, 'loc': loc, 'heading': heading,
+                       'rotation': rotation, 'movement': movement, 'coverage': p,
+                       'walls': self.maps.walls})
 
         return rotation, movement
     
+    def exploration_done(self, p):
+        if self.strategy == 'frontier':
+            return self.found_goal and self.race_proven()
+        return p >= self.min_percentage and self.found_goal
+
     def explore(self):
         # get all possible indices that could be visited next
         this_idx = self.loc_to_idx(*self.loc)
@@ -60,109 +122,163 @@ class Planner(object):
 
         # rotate 90 degrees if stuck in dead end
         if not len(valid_indices):
-            self.heading = cardinal_points[(cardinal_points.index(self.heading) + 1) % 4]
-            if verbose:
-                print 'idx', this_idx, '--> idx', this_idx, 'rot', 90, 'mov', 0
-            return 90, 0
+            return self.move_to(this_idx, None)
 
         # filter all indices that weren't visited before
-        unvisited_indices = filter(lambda x: x not in self.maps.visited, valid_indices)
+        unvisited_indices = [idx for idx in valid_indices if idx not in self.maps.visited]
 
         # choose the index with the maximum reward
         if len(unvisited_indices):
-            rewards = map(self.maps.get_reward_from_idx, unvisited_indices)
+            rewards = [self.maps.get_reward_from_idx(idx) for idx in unvisited_indices]
             decision_idx = unvisited_indices[np.argmax(rewards)]
         else: 
-            decision_idx = random.choice(valid_indices)
-
-        rotation, movement = self.calculate_move_from_this_to_next_idx(this_idx, decision_idx)
-        if verbose:
-            print 'idx', this_idx, '--> idx', decision_idx, 'rot', rotation, 'mov', movement
+            decision_idx = self.rng.choice(valid_indices)
 
-        self.loc = list(self.idx_to_loc(decision_idx))
+        rotation, movement = self.move_to(this_idx, decision_idx)
 
         if not self.found_goal:
             self.check_goal_found()
         
         return rotation, movement
 
-    def align_sensors_to_cardinal(self, sensors):
-        # work out how many steps the robot can take in each direction w, n, e, s
-        if self.heading == 'w':
-            aligned_sensors = list(sensors[1:] + [0] + [sensors[0]])
-        elif self.heading == 'n':
-            aligned_sensors = list(sensors + [0])
-        elif self.heading == 'e':
-            aligned_sensors = list([0] + sensors)
+    def explore_flood(self):
+        this_idx = self.loc_to_idx(*self.loc)
+        valid_indices = self.maps.get_adj_indices(this_idx)
+
+        # rotate 90 degrees to look around if no move is known
+        if not len(valid_indices):
+            return self.move_to(this_idx, None)
+
+        if not self.found_goal:
+            # downhill in the flood field, preferring cells not seen yet
+            dist = self.flood.dist
+            decision_idx = min(valid_indices, key=lambda i: (dist[i], i in self.maps.visited))
         else:
-            aligned_sensors = list([sensors[-1]] + [0] + sensors[:-1])
+            # on to the closest unvisited cell once the goal was entered
+            decision_idx = self.first_move_towards(this_idx, lambda idx: idx not in self.maps.visited)
+            if decision_idx is None:
+                decision_idx = self.rng.choice(valid_indices)
 
-        return dict(zip(cardinal_points, aligned_sensors))
+        return self.move_to(this_idx, decision_idx)
+
+    def explore_frontier(self):
+        if not self.found_goal:
+            return self.explore_flood()
+        this_idx = self.loc_to_idx(*self.loc)
+        valid_indices = self.maps.get_adj_indices(this_idx)
+
+        # rotate 90 degrees if stuck, or to see the wall behind a frontier cell
+        if not len(valid_indices) or this_idx in self.frontier:
+            return self.move_to(this_idx, None)
+
+        # head for the nearest frontier cell; once the race is proven the
+        # training run ends before exploring
+        decision_idx = self.first_move_towards(this_idx, lambda idx: idx in self.frontier)
+        if decision_idx is None:
+            decision_idx = self.rng.choice(valid_indices)
+
+        return self.move_to(this_idx, decision_idx)
+
+    def move_to(self, this_idx, decision_idx):
+        # rotate 90 degrees to look around if decision_idx is None, else
+        # move there and note a goal index entered for the first time
+        if decision_idx is None:
+            self.heading = cardinal_points[(cardinal_points.index(self.heading) + 1) % 4]
+            return 90, 0
+
+        rotation, movement = self.calculate_move_from_this_to_next_idx(this_idx, decision_idx)
+
+        self.loc = list(self.idx_to_loc(decision_idx))
+
+        if decision_idx in self.goal_indices and not self.found_goal:
+            self.found_goal = True
+            self.found_goal_idx = decision_idx
 
-    def calculate_move_from_this_to_next_idx(self, this_idx, next_idx):
-        # work out rotation and movement from one index to the next
-        adj_indices = self.get_adj_indices_from_idx(this_idx)
-        next_heading, movement = self.heading, 0
-
-        # work out movement
-        for cardinal, indices in adj_indices.items():
-            if next_idx in indices.keys():
-                movement = indices[next_idx]
-                next_heading = cardinal
-
-        # work out rotation
-        angles = {'w': [-90, 270], 'n': [0], 'e': [90, -270], 's': [180, -180]}
-        rotation = -angles[self.heading][0] + angles[next_heading][0]
-        rotation = 90 if rotation == -270 else rotation
-        rotation = -90 if rotation == 270 else rotation
-
-        self.heading = next_heading
-        
         return rotation, movement
 
-    def get_valid_adj_indices_from_idx(self, this_idx):
-        # get all adjacent indices
-        possible_idx = np.nonzero(self.maps.A1[this_idx, :])[0]
-        adj_indices = self.get_adj_indices_from_idx(this_idx)
+    def update_bounds(self):
+        # the race over the optimistic walls can only get slower and the race
+        # over the known walls only faster as more walls are seen
+        if self.bounds_known is not None and np.array_equal(self.bounds_known, self.maps.known):
+            return
+        self.bounds_known = self.maps.known.copy()
+
+        self.lower_steps = plan_race(self.maps.optimistic_walls(), origin_idx, headings['n'], self.goal_indices)
+        self.upper_steps = None
+        if any(self.maps.paths.is_reachable(g) for g in self.goal_indices):
+            self.upper_steps = plan_race(self.maps.walls, origin_idx, headings['n'], self.goal_indices)
+
+        # cells on both sides of the walls not seen yet that the optimistic race passes
+        self.frontier = set()
+        for idx, direction, next_idx in follow_cells(self.dim, origin_idx, headings['n'], self.lower_steps or []):
+            x, y = self.idx_to_loc(idx)
+            if not self.maps.known[x, y] & (1 << direction):
+                self.frontier.update([idx, next_idx])
+
+    def race_proven(self):
+        # no wall that was not seen yet can make the race any faster
+        return self.upper_steps is not None and len(self.upper_steps) <= len(self.lower_steps)
+
+    def first_move_towards(self, this_idx, is_target):
+        # breadth-first search over the known moves for the nearest target
+        # index, returning the first move on the way there
+        first = {this_idx: None}
+        queue = deque([this_idx])
+        while queue:
+            idx = queue.popleft()
+            for next_idx in self.maps.get_adj_indices(idx):
+                if next_idx in first:
+                    continue
+                first[next_idx] = first[idx] if first[idx] is not None else next_idx
+                if is_target(next_idx):
+                    return first[next_idx]
+                queue.append(next_idx)
+        return None
 
-        # exclude indices that would require 180 degree turn
-        ignore_opposed = {'n': 's', 'e': 'w', 's': 'n', 'w': 'e'}
-        to_ignore = adj_indices[ignore_opposed[self.heading]].keys()
+    def align_sensors_to_cardinal(self, sensors):
+        # work out how many steps the robot can take to its left, front and
+        # right as w, n, e, s; nothing is known about the direction behind it
+        i = cardinal_points.index(self.heading)
+        return dict((cardinal_points[(i + k) % 4], s) for k, s in zip([-1, 0, 1], sensors))
 
-        return [idx for idx in possible_idx if idx not in to_ignore]
+    def calculate_move_from_this_to_next_idx(self, this_idx, next_idx):
+        # work out rotation and movement from one index to the next
+        destinations = self.moves[this_idx].ravel().tolist()
+        if next_idx not in destinations:
+            return 0, 0
+        cardinal, movement = divmod(destinations.index(next_idx), limit)
+        movement += 1
+
+        # work out rotation; move backwards instead of turning around
+        rotation = rotations[cardinal_points.index(self.heading)][cardinal]
+        if rotation is None:
+            return 0, -movement
 
-    def get_adj_indices_from_idx(self, this_idx):
-        # get all adjacent indices bounded by outer maze walls, excluding itself, ignoring walls of grid
-        north = range(this_idx, self.dim ** 2, self.dim)[1:4]
-        east = range(this_idx + 1, this_idx + self.dim - this_idx % self.dim)[:3]
-        south = range(this_idx, -1, - self.dim)[1:4]
-        west = range(this_idx - 1, this_idx - this_idx % self.dim - 1, -1)[:4]
+        self.heading = cardinal_points[cardinal]
 
-        adj_indices = dict()
-        for name, indices in zip(cardinal_points, [west, north, east, south]):
-            adj_indices[name] = dict(zip(indices, range(1, len(indices) + 1)))
+        return rotation, movement
 
-        return adj_indices
+    def get_valid_adj_indices_from_idx(self, this_idx):
+        # get all adjacent indices, excluding those that would require a 180 degree turn
+        behind = self.moves[this_idx, cardinal_points.index(opposite[self.heading])].tolist()
+        return [idx for idx in self.maps.get_adj_indices(this_idx) if idx not in behind]
 
     def check_goal_found(self):
         for goal in self.goal_indices:
-            if sum(self.maps.A1[goal]) != 0:
+            if self.maps.has_moves(goal):
                 self.found_goal = True
                 self.found_goal_idx = goal
 
-    def calculate_shortest_path_between_indices(self, idx1, idx2): 
-        # Floyd-Warshall algorithm
-        path = []
-
-        def follow_path(p, i, j):
-            if i == j:
-                path.append(i)
-            else:
-                follow_path(p, int(i), int(p[i, j]))
-                path.append(j)
-
-        follow_path(self.maps.tree, idx1, idx2)
-        return path
+    def calculate_shortest_path_to_index(self, idx):
+        # walk back along the predecessors of the shortest path tree, which
+        # is rooted at the origin
+        tree, source = self.maps.tree, self.maps.paths.source
+        if tree[idx] < 0:
+            raise Exception('Index {} is not connected to the origin!'.format(idx))
+        path = [idx]
+        while path[-1] != source:
+            path.append(int(tree[path[-1]]))
+        return path[::-1]
 
     def reset(self):
         self.found_shortest_path = True
@@ -171,12 +287,17 @@ class Planner(object):
         self.heading = 'n'
 
         self.maps.build_tree_rep()
-        shortest_path_indices = self.calculate_shortest_path_between_indices(origin_idx, self.found_goal_idx)
-        self.optimal_steps = self.calculate_optimal_steps(shortest_path_indices)
-        
-        print 'found with path length ', len(self.optimal_steps),
-        
-        #print 'indices', shortest_path_indices, '\nmoves', self.optimal_steps
+
+        # race to the closest goal index that is connected to the origin
+        reachable = [g for g in self.goal_indices if self.maps.paths.is_reachable(g)]
+        if reachable:
+            self.found_goal_idx = min(reachable, key=lambda g: self.maps.paths.dist[g])
+
+        # fewest time steps over the known walls, turning and moving up to
+        # three cells in each step
+        self.optimal_steps = plan_race(self.maps.walls, origin_idx, headings[self.heading], self.goal_indices)
+        if self.optimal_steps is None:
+            raise Exception('No goal is connected to the origin by the known walls!')
 
     def calculate_optimal_steps(self, shortest_path_indices):
         optimal_steps = []
@@ -192,4 +313,4 @@ class Planner(object):
         return x + y*self.dim
 
     def idx_to_loc(self, idx):
-        return idx % self.dim, int(idx/self.dim)
+        return idx % self.dim, idx // self.dim
@@ -0,0 +1,100 @@
+'''
+Opt-in timing of the phases of a simulation. While a Profiler is installed
+the hot methods of the simulator, robot, planner and mapper are wrapped
+with timers; uninstalled, the original methods are back in place and cost
+nothing extra. Install it before the robots are created, e.g.
+
+    with Profiler(timeline=True) as profiler:
+        Simulator(maze, Robot).run()
+    print(profiler.report())
+    profiler.write_chrome_trace('trace.json')
+'''
+from timeit import default_timer
+import json
+
+# (module, class, method, phase) of every timed method
+hot_paths = [('simulator', 'Simulator', 'sense', 'sensing'),
+             ('maze', 'Maze', 'dist_to_wall', 'sensing'),
+             ('mapper', 'Mapper', 'update', 'mapping'),
+             ('mapper', 'Mapper', 'build_tree_rep', 'reset'),
+             ('planner', 'Planner', 'explore', 'deciding'),
+             ('planner', 'Planner', 'explore_flood', 'deciding'),
+             ('planner', 'Planner', 'explore_frontier', 'deciding'),
+             ('planner', 'Planner', 'update_bounds', 'deciding'),
+             ('planner', 'Planner', 'get_valid_adj_indices_from_idx', 'deciding'),
+             ('planner', 'Planner', 'reset', 'reset'),
+             ('robot', 'Robot', 'next_move', 'robot')]
+
+
+class Profiler(object):
+    def __init__(self, timeline=False):
+        self.stats = dict()  # name -> [phase, calls, seconds]
+        self.phases = dict()  # phase -> [active calls, seconds of the outermost calls]
+        self.events = [] if timeline else None  # (name, phase, start, end) of every call
+        self.originals = []
+        self.start = default_timer()
+
+    def install(self):
+        for module_name, class_name, method, phase in hot_paths:
+            cls = getattr(__import__(module_name), class_name)
+            function = cls.__dict__[method]
+            self.originals.append((cls, method, function))
+            setattr(cls, method, self.timed(class_name + '.' + method, phase, function))
+        return self
+
+    def uninstall(self):
+        for cls, method, function in reversed(self.originals):
+            setattr(cls, method, function)
+        self.originals = []
+
+    def __enter__(self):
+        return self.install()
+
+    def __exit__(self, *exc_info):
+        self.uninstall()
+
+    def timed(self, name, phase, function):
+        stats = self.stats.setdefault(name, [phase, 0, 0.0])
+        phase_stats = self.phases.setdefault(phase, [0, 0.0])
+        events = self.events
+
+        def timed_function(*args, **kwargs):
+            start = default_timer()
+            phase_stats[0] += 1
+            try:
+                return function(*args, **kwargs)
+            finally:
+                end = default_timer()
+                stats[1] += 1
+                stats[2] += end - start
+                # a call within another call of the same phase is already timed
+                phase_stats[0] -= 1
+                if not phase_stats[0]:
+                    phase_stats[1] += end - start
+                if events is not None:
+                    events.append((name, phase, start, end))
+        return timed_function
+
+    def phase_totals(self):
+        # seconds per phase, counting nested calls of the same phase once;
+        # calls nested in another phase (e.g. deciding within robot) are
+        # counted in both phases
+        return dict((phase, seconds) for phase, (active, seconds) in self.phases.items())
+
+    def report(self):
+        lines = ['{:40} {:10} {:>8} {:>12} {:>12}'.format('method', 'phase', 'calls', 'total ms', 'us/call')]
+        for name, (phase, calls, seconds) in sorted(self.stats.items(), key=lambda s: -s[1][2]):
+            if calls:
+                lines.append('{:40} {:10} {:8d} {:12.3f} {:12.3f}'.format(
+                    name, phase, calls, 1e3 * seconds, 1e6 * seconds / calls))
+        return '\n'.join(lines)
+
+    def chrome_trace(self):
+        # timeline in the Trace Event Format of chrome://tracing and Perfetto
+        return {'traceEvents': [{'name': name, 'cat': phase, 'ph': 'X', 'pid': 0, 'tid': 0,
+                                 'ts': 1e6 * (start - self.start), 'dur': 1e6 * (end - start)}
+                                for name, phase, start, end in self.events or []]}
+
+    def write_chrome_trace(self, path):
+        with open(path, 'w') as f_out:
+            json.dump(self.chrome_trace(), f_out)
@@ -0,0 +1,72 @@
+import numpy as np
+from collections import deque
+from maze import build_ray_table
+
+# headings are integers in the bit order of the walls: up, right, down, left,
+# and each rotation turns the heading by a fixed offset
+rotation_turns = [(-90, 3), (0, 0), (90, 1)]
+limit = 3  # maximum number of cells moved in one step
+
+
+def plan_race(walls, start_idx, start_heading, goal_indices):
+    '''
+    Returns the shortest list of (rotation, movement) steps that takes a
+    robot at start_idx, facing start_heading, into one of the goal indices,
+    or None if no goal can be reached. walls are coded like Maze.walls, and
+    only their open passages are used. The search runs over (index, heading)
+    states with the moves of the tester: rotate by -90, 0 or 90 degrees and
+    then move up to three cells forwards or backwards in the same step.
+    '''
+    dim = len(walls)
+    steps = [dim, 1, -dim, -1]  # index offset of one cell in each heading
+
+    # cells that can be passed in every heading, per index
+    rays = np.minimum(build_ray_table(np.asarray(walls)), limit)
+    rays = rays.transpose(1, 0, 2).reshape(dim * dim, 4).tolist()
+
+    goals = set(goal_indices)
+    start = start_idx * 4 + start_heading
+    if start_idx in goals:
+        return []
+
+    # breadth-first search, remembering the state and move leading to a state
+    pred = [None] * (dim * dim * 4)
+    pred[start] = (start, None)
+    queue = deque([start])
+    while queue:
+        state = queue.popleft()
+        idx, heading = divmod(state, 4)
+        for rotation, turn in rotation_turns:
+            h = (heading + turn) % 4
+            for direction, sign in ((h, 1), ((h + 2) % 4, -1)):
+                for movement in range(1, rays[idx][direction] + 1):
+                    next_idx = idx + steps[direction] * movement
+                    next_state = next_idx * 4 + h
+                    if pred[next_state] is not None:
+                        continue
+                    pred[next_state] = (state, (rotation, sign * movement))
+                    if next_idx in goals:
+                        return follow_moves(pred, start, next_state)
+                    queue.append(next_state)
+    return None
+
+
+def follow_cells(dim, start_idx, start_heading, moves):
+    # (index, direction, next index) of every single cell hop along a list of steps
+    steps = [dim, 1, -dim, -1]
+    turns = dict(rotation_turns)
+    idx, heading = start_idx, start_heading
+    for rotation, movement in moves:
+        heading = (heading + turns[rotation]) % 4
+        direction = heading if movement > 0 else (heading + 2) % 4
+        for _ in range(abs(movement)):
+            yield idx, direction, idx + steps[direction]
+            idx += steps[direction]
+
+
+def follow_moves(pred, start, state):
+    moves = []
+    while state != start:
+        state, move = pred[state]
+        moves.append(move)
+    return moves[::-1]
@@ -0,0 +1,135 @@
+'''
+Draws mazes into numpy pixel buffers and writes them as PNG files, without
+any window, e.g.
+
+    pixels = render(maze.walls, mapper=robot.planner.maps, paths=result.path)
+    write_png('images/run.png', pixels)
+
+The walls of the maze are black. Walls the robot saw closed are drawn over
+them in blue, and the cells it knows any wall of are tinted. Trajectories
+are lines between the centres of the cells the robot stopped at.
+'''
+from concurrent.futures import ProcessPoolExecutor
+from maze import Maze
+import numpy as np
+import os
+import struct
+import zlib
+
+background = (255, 255, 255)
+wall_colour = (0, 0, 0)
+known_wall_colour = (40, 90, 220)
+known_cell_colour = (225, 235, 250)
+goal_colour = (255, 235, 200)
+path_colours = [(230, 120, 20), (20, 160, 60)]  # training run, race
+
+
+def wall_lines(walls):
+    '''
+    Returns the closed walls of a maze coded like Maze.walls as horizontal
+    lines, (dim + 1, dim), and vertical lines, (dim, dim + 1), both indexed
+    [line, cell] in screen order: top line and left column first.
+    '''
+    rows = walls[:, ::-1].T  # wall codes by screen row, top row first
+    horizontal = np.vstack([rows[:1] & 1 == 0, rows & 4 == 0])
+    vertical = np.hstack([rows[:, :1] & 8 == 0, rows & 2 == 0])
+    return horizontal, vertical
+
+
+def draw_lines(pixels, walls, colour, cell, margin):
+    horizontal, vertical = wall_lines(walls)
+    dim = len(walls)
+    size = dim * cell + 1
+
+    # every wall covers its cell edge and the corner pixels at both ends
+    lines = np.zeros((dim + 1, size), dtype=bool)
+    segments = np.repeat(horizontal, cell, axis=1)
+    lines[:, :-1] |= segments
+    lines[:, 1:] |= segments
+    pixels[margin:margin + size:cell, margin:margin + size][lines] = colour
+
+    lines = np.zeros((size, dim + 1), dtype=bool)
+    segments = np.repeat(vertical, cell, axis=0)
+    lines[:-1] |= segments
+    lines[1:] |= segments
+    pixels[margin:margin + size, margin:margin + size:cell][lines] = colour
+
+
+def fill_cells(pixels, mask, colour, cell, margin):
+    # mask is indexed [x, y] like Maze.walls
+    dim = len(mask)
+    cells = np.kron(mask[:, ::-1].T, np.ones((cell, cell), dtype=bool)).astype(bool)
+    pixels[margin:margin + dim * cell, margin:margin + dim * cell][cells] = colour
+
+
+def draw_path(pixels, dim, path, colour, cell, margin):
+    # line through the cell centres, starting from the start cell
+    centres = [(margin + x * cell + cell // 2, margin + (dim - 1 - y) * cell + cell // 2)
+               for x, y in [(0, 0)] + list(path)]
+    for (c0, r0), (c1, r1) in zip(centres, centres[1:]):
+        pixels[min(r0, r1):max(r0, r1) + 1, min(c0, c1):max(c0, c1) + 1] = colour
+
+
+def render(walls, cell=20, margin=10, mapper=None, paths=()):
+    '''
+    Returns an RGB image of the maze walls as a (height, width, 3) uint8
+    array. mapper is an optional Mapper (or anything with its walls and
+    known arrays) whose knowledge is drawn over the maze, and paths are the
+    locations of a robot after every step, e.g. SimulationResult.path.
+    '''
+    walls = np.asarray(walls)
+    dim = len(walls)
+    size = dim * cell + 1 + 2 * margin
+    pixels = np.empty((size, size, 3), dtype=np.uint8)
+    pixels[:] = background
+
+    goal = np.zeros((dim, dim), dtype=bool)
+    goal[dim // 2 - 1:dim // 2 + 1, dim // 2 - 1:dim // 2 + 1] = True
+    fill_cells(pixels, goal, goal_colour, cell, margin)
+    if mapper is not None:
+        fill_cells(pixels, mapper.known != 0, known_cell_colour, cell, margin)
+
+    draw_lines(pixels, walls, wall_colour, cell, margin)
+    if mapper is not None:
+        # walls seen closed are the known ones that were not seen open
+        draw_lines(pixels, 15 ^ (mapper.known & ~mapper.walls), known_wall_colour, cell, margin)
+
+    for k, path in enumerate(paths):
+        draw_path(pixels, dim, path, path_colours[k % len(path_colours)], cell, margin)
+    return pixels
+
+
+def png_chunk(kind, data):
+    return (struct.pack('>I', len(data)) + kind + data +
+            struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+
+
+def write_png(filename, pixels):
+    # writes an RGB uint8 array as an 8 bit PNG, every line unfiltered
+    height, width = pixels.shape[:2]
+    lines = np.zeros((height, 1 + 3 * width), dtype=np.uint8)
+    lines[:, 1:] = pixels.reshape(height, -1)
+    with open(filename, 'wb') as f_out:
+        f_out.write(b'\x89PNG\r\n\x1a\n')
+        f_out.write(png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+        f_out.write(png_chunk(b'IDAT', zlib.compress(lines.tobytes(), 6)))
+        f_out.write(png_chunk(b'IEND', b''))
+
+
+def render_file(args):
+    maze_name, out_path, cell = args
+    write_png(out_path, render(Maze(maze_name).walls, cell))
+    return out_path
+
+
+def render_corpus(maze_names, out_dir, cell=20, workers=None):
+    '''
+    Writes out_dir/<maze file name>.png for every maze file, spread over a
+    pool of worker processes, and returns the image file names.
+    '''
+    if not os.path.isdir(out_dir):
+        os.makedirs(out_dir)
+    jobs = [(m, os.path.join(out_dir, os.path.splitext(os.path.basename(m))[0] + '.png'), cell)
+            for m in maze_names]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(render_file, jobs, chunksize=max(1, len(jobs) // 64)))
@@ -0,0 +1,105 @@
+'''
+Live view of a run in an ANSI terminal, e.g.
+
+    renderer = TerminalRenderer(max_fps=30)
+    Simulator(maze, lambda dim: Robot(dim, sink=renderer)).run()
+    renderer.close()
+
+The renderer is a Planner sink that only hands each step over to a drawing
+thread, so the planner never waits for the terminal. The thread draws the
+latest step it was given, at most max_fps times a second, skipping the
+steps in between. It keeps the last frame on screen and rewrites only the
+characters that changed, walls and robot marker, with cursor positioning.
+'''
+from mapper import frame_chars
+from timeit import default_timer
+import numpy as np
+import sys
+import threading
+import time
+
+clear_screen = '\x1b[2J\x1b[H'
+
+
+def move_cursor(line, column):
+    # ANSI cursor positioning, counted from 1
+    return '\x1b[{};{}H'.format(line + 1, column + 1)
+
+
+def changed_runs(frame, last):
+    # (line, column, text) of every run of characters that differs from last
+    runs = []
+    for line in np.flatnonzero((frame != last).any(axis=1)).tolist():
+        columns = np.flatnonzero(frame[line] != last[line]).tolist()
+        start = end = columns[0]
+        for column in columns[1:] + [None]:
+            if column == end + 1:
+                end = column
+                continue
+            runs.append((line, start, ''.join(frame[line, start:end + 1])))
+            if column is not None:
+                start = end = column
+    return runs
+
+
+class TerminalRenderer(object):
+    def __init__(self, max_fps=30, stream=None):
+        self.stream = stream or sys.stdout
+        self.interval = 1. / max_fps if max_fps else 0.
+        self.last = None  # frame on screen
+        self.status = ''  # text below the map
+        self.pending = None  # latest step not drawn yet
+        self.closing = False
+        self.lock = threading.Lock()  # guards pending
+
+        self.wake = threading.Event()
+        self.thread = threading.Thread(target=self.draw_loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def __call__(self, event):
+        # copy what the planner keeps changing and return straight away
+        if event['event'] == 'step':
+            step = (event['walls'].copy(), list(event['loc']), event['heading'],
+                    '## Step {} ## {} %'.format(event['t'], int(event['coverage'])))
+            with self.lock:
+                self.pending = step
+        elif event['event'] == 'reset':
+            self.status = 'Finished at step {} found with path length {}'.format(
+                event['t'], event['path_length'])
+        self.wake.set()
+
+    def draw_loop(self):
+        while True:
+            self.wake.wait()
+            self.wake.clear()
+            with self.lock:
+                step, self.pending = self.pending, None
+            if step is not None:
+                start = default_timer()
+                self.draw(*step)
+                time.sleep(max(0., self.interval - (default_timer() - start)))
+            with self.lock:
+                if self.closing and self.pending is None:
+                    return
+
+    def draw(self, walls, loc, heading, step_text):
+        frame = frame_chars(walls, loc, heading)
+        if self.last is None or self.last.shape != frame.shape:
+            out = [clear_screen] + [''.join(line) + '\n' for line in frame]
+        else:
+            out = [move_cursor(line, column) + text for line, column, text in changed_runs(frame, self.last)]
+        self.last = frame
+
+        # status lines below the map, then park the cursor under them
+        out.append(move_cursor(len(frame), 0) + '\x1b[K' + step_text)
+        out.append(move_cursor(len(frame) + 1, 0) + '\x1b[K' + self.status)
+        out.append(move_cursor(len(frame) + 2, 0))
+        self.stream.write(''.join(out))
+        self.stream.flush()
+
+    def close(self):
+        # draw the last step and stop the drawing thread
+        self.closing = True
+        self.wake.set()
+        self.thread.join()
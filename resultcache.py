@@ -0,0 +1,97 @@
+import hashlib
+import json
+import numpy as np
+import os
+import sqlite3
+
+# modules whose code decides the outcome of a simulation
+simulation_modules = ['maze.py', 'mapper.py', 'planner.py', 'robot.py', 'simulator.py',
+                      'floodfill.py', 'raceplan.py']
+
+
+def code_version():
+    # content hash of the simulation code, so that results of older code are not reused
+    sha = hashlib.sha1()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name in simulation_modules:
+        with open(os.path.join(directory, name), 'rb') as f_in:
+            sha.update(f_in.read())
+    return sha.hexdigest()[:12]
+
+
+def maze_hash(maze):
+    # content hash of the walls, independent of the maze's file name
+    sha = hashlib.sha1(str(maze.dim).encode())
+    sha.update(np.ascontiguousarray(maze.walls, dtype=np.uint8).tobytes())
+    return sha.hexdigest()
+
+
+class ResultCache(object):
+    '''
+    Persistent store of sweep records in SQLite, keyed by the hash of the
+    maze walls, the planner parameters, the seed and the code version. Only
+    records of the current code version are read; older ones stay on disk
+    until evict is called.
+    '''
+    def __init__(self, path, version=None):
+        self.version = version or code_version()
+        self.db = sqlite3.connect(path)
+        self.db.execute('''CREATE TABLE IF NOT EXISTS results (
+                               maze_hash TEXT, params TEXT, seed INTEGER, version TEXT,
+                               maze TEXT, score REAL, runtimes TEXT,
+                               PRIMARY KEY (maze_hash, params, seed, version))''')
+
+    def get(self, maze_hash, params, seed):
+        row = self.db.execute('''SELECT maze, score, runtimes FROM results
+                                 WHERE maze_hash = ? AND params = ? AND seed = ? AND version = ?''',
+                              (maze_hash, json.dumps(list(params)), seed, self.version)).fetchone()
+        if row is None:
+            return None
+        return {'maze': row[0], 'params': list(params), 'seed': seed,
+                'score': row[1], 'runtimes': json.loads(row[2]), 'error': None}
+
+    def put(self, maze_hash, record):
+        self.db.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)',
+                        (maze_hash, json.dumps(list(record['params'])), record['seed'], self.version,
+                         record['maze'], record['score'], json.dumps(record['runtimes'])))
+        self.db.commit()
+
+    def evict(self):
+        # drop the records of every other code version, returns how many
+        count = self.db.execute('DELETE FROM results WHERE version != ?', (self.version,)).rowcount
+        self.db.commit()
+        return count
+
+    def aggregate(self, percentiles=(10, 50, 90)):
+        '''
+        Returns the statistics of the completed runs for every maze and
+        parameter setting: number of runs and failures, mean and percentiles.
+        '''
+        rows = self.db.execute('''SELECT maze_hash, maze, params, COUNT(*), COUNT(score), AVG(score)
+                                  FROM results WHERE version = ?
+                                  GROUP BY maze_hash, params ORDER BY maze, params''',
+                               (self.version,)).fetchall()
+        stats = []
+        for maze_hash, maze, params, runs, completed, mean in rows:
+            scores = [s for (s,) in self.db.execute('''SELECT score FROM results
+                                                      WHERE maze_hash = ? AND params = ? AND version = ?
+                                                      AND score IS NOT NULL''',
+                                                   (maze_hash, params, self.version))]
+            stat = {'maze': maze, 'params': json.loads(params), 'runs': runs,
+                    'failed': runs - completed, 'mean': mean}
+            for p in percentiles:
+                stat['p{}'.format(p)] = float(np.percentile(scores, p)) if scores else None
+            stats.append(stat)
+        return stats
+
+    def write_stats(self, path, percentiles=(10, 50, 90)):
+        # plain text table of the aggregated statistics
+        with open(path, 'w') as f_out:
+            for stat in self.aggregate(percentiles):
+                f_out.write('{} {} runs={} failed={} mean={} {}\n'.format(
+                    stat['maze'], ','.join(str(p) for p in stat['params']), stat['runs'],
+                    stat['failed'], stat['mean'],
+                    ' '.join('p{}={}'.format(p, stat['p{}'.format(p)]) for p in percentiles)))
+
+    def close(self):
+        self.db.close()
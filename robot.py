@@ -2,18 +2,22 @@ import numpy as np
 from planner import Planner
 
 class Robot(object):
-    def __init__(self, maze_dim, params=[]):
+    def __init__(self, maze_dim, params=[], seed=None, sink=None, strategy='reward', planner=None):
         '''
         Use the initialization function to set up attributes that your robot
         will use to learn and navigate the maze. Some initial attributes are
         provided based on common information, including the size of the maze
-        the robot is placed in.
+        the robot is placed in. Runs are reproducible when a seed (or a
+        random.Random instance) is given, and planning events are passed to
+        sink if one is given. strategy selects how the maze is explored in
+        the training run, see Planner. A planner restored from a snapshot can
+        be passed instead; if it finished its training run, the robot races.
         '''
 
-        self.planner = Planner(maze_dim, params)
+        self.planner = planner or Planner(maze_dim, params, seed, sink, strategy)
         self.maze_dim = maze_dim
 
-        self.race = False #False: trial 1,  True: trial 2
+        self.race = self.planner.found_shortest_path #False: trial 1,  True: trial 2
         self.t = 0 #timestep
 
     def next_move(self, sensors):
@@ -0,0 +1,119 @@
+'''
+Binary traces of simulations: one fixed-width record per time step, so
+that runs can be replayed, compared and analysed without running the robot
+again, e.g.
+
+    with TraceWriter('stats/runs.trace') as trace:
+        Simulator(maze, robot_factory, trace=trace).run()
+    steps = load_trace('stats/runs.trace')
+
+A trace file is a short header followed by the records of step_dtype,
+appended one simulation at a time. Loading memory-maps the records, so
+even traces of millions of steps open instantly and are only read as far
+as they are used.
+'''
+from simulator import SimulationResult, flag_reset, flag_goal
+import numpy as np
+import os
+
+magic = b'MMTRACE1'
+header_size = 16
+
+# (x, y, heading) are the robot's location and heading when sensing, and
+# (end_x, end_y) its location after the move; coverage counts the cells it
+# stood on in this run so far
+step_dtype = np.dtype([('sim', '<u4'), ('run', 'u1'), ('t', '<u2'),
+                       ('x', 'u1'), ('y', 'u1'), ('heading', 'u1'), ('sensors', 'u1', 3),
+                       ('rotation', '<i2'), ('movement', 'i1'),
+                       ('end_x', 'u1'), ('end_y', 'u1'), ('flags', 'u1'), ('coverage', '<u2')])
+
+
+class TraceWriter(object):
+    '''
+    Appends the steps of simulations to a trace file. Every simulation is
+    numbered in the sim field, continuing after the last one in the file.
+    '''
+    def __init__(self, path):
+        self.path = path
+        self.next_sim = 0
+        if os.path.exists(path) and os.path.getsize(path) > header_size:
+            self.next_sim = int(load_trace(path)['sim'][-1]) + 1
+        self.f_out = open(path, 'ab')
+        if self.f_out.tell() == 0:
+            self.f_out.write(magic.ljust(header_size, b'\0'))
+
+    def write(self, records):
+        # records are tuples of the fields of step_dtype after sim
+        steps = np.array([(self.next_sim,) + r for r in records], dtype=step_dtype)
+        self.f_out.write(steps.tobytes())
+        self.f_out.flush()
+        self.next_sim += 1
+
+    def close(self):
+        self.f_out.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def load_trace(path):
+    # read-only memory map of the steps in a trace file
+    with open(path, 'rb') as f_in:
+        if f_in.read(len(magic)) != magic:
+            raise Exception('{} is not a run trace!'.format(path))
+    if os.path.getsize(path) == header_size:
+        return np.zeros(0, dtype=step_dtype)
+    return np.memmap(path, dtype=step_dtype, mode='r', offset=header_size)
+
+
+def split_simulations(steps):
+    # views of the steps of every simulation, in the order of the trace
+    bounds = np.flatnonzero(np.diff(steps['sim'])) + 1
+    return np.split(steps, bounds)
+
+
+def to_result(steps):
+    '''
+    Rebuilds the SimulationResult of one simulation from its steps: run
+    times, goal hits and the path of each run. Moves are given as the
+    rotation and movement the simulator carried out.
+    '''
+    result = SimulationResult()
+    for step in steps.tolist():
+        run, t, flags = step[1], step[2], step[11]
+        if flags & flag_reset:
+            result.moves[run].append(('Reset', 'Reset'))
+            if run == 0 and result.hit_goal[0]:
+                result.runtimes.append(t)
+            continue
+        result.moves[run].append((step[7], step[8]))
+        result.path[run].append((step[9], step[10]))
+        if flags & flag_goal:
+            result.hit_goal[run] = True
+            if run != 0:
+                result.runtimes.append(t - sum(result.runtimes))
+    return result
+
+
+def first_difference(steps, other):
+    '''
+    Returns the index of the first step in which two simulations differ,
+    apart from their numbers, and the names of the differing fields; or
+    None if they are the same. A step missing from one of them counts as a
+    difference of all fields.
+    '''
+    fields = step_dtype.names[1:]
+    n = min(len(steps), len(other))
+    differs = np.zeros(n, dtype=bool)
+    for name in fields:
+        column = steps[name][:n] != other[name][:n]
+        differs |= column.reshape(n, -1).any(axis=1)
+    if differs.any():
+        k = int(np.argmax(differs))
+        return k, [name for name in fields if np.any(steps[name][k] != other[name][k])]
+    if len(steps) != len(other):
+        return n, list(fields)
+    return None
@@ -1,58 +1,37 @@
 from maze import Maze
-import turtle
+from robot import Robot
+from simulator import Simulator
+from raster import render, render_corpus, write_png
+import os
 import sys
 
 if __name__ == '__main__':
     '''
-    This function uses Python's turtle library to draw a picture of the maze
-    given as an argument when running the script.
+    This script draws pictures of the mazes given as arguments when running
+    the script into images/<maze name>.png, e.g.
+        python showmaze.py test_maze_01.txt [test_maze_02.txt ...] [--run seed]
+    With --run, a single maze is drawn together with the walls the robot
+    found and its paths in both runs.
     '''
-
-    # Create a maze based on input argument on command line.
-    testmaze = Maze( str(sys.argv[1]) )
-
-    # Intialize the window and drawing turtle.
-    window = turtle.Screen()
-    wally = turtle.Turtle()
-    wally.speed(0)
-    wally.hideturtle()
-    wally.penup()
-
-    # maze centered on (0,0), squares are 20 units in length.
-    sq_size = 20
-    origin = testmaze.dim * sq_size / -2
-
-    # iterate through squares one by one to decide where to draw walls
-    for x in range(testmaze.dim):
-        for y in range(testmaze.dim):
-            if not testmaze.is_permissible([x,y], 'up'):
-                wally.goto(origin + sq_size * x, origin + sq_size * (y+1))
-                wally.setheading(0)
-                wally.pendown()
-                wally.forward(sq_size)
-                wally.penup()
-
-            if not testmaze.is_permissible([x,y], 'right'):
-                wally.goto(origin + sq_size * (x+1), origin + sq_size * y)
-                wally.setheading(90)
-                wally.pendown()
-                wally.forward(sq_size)
-                wally.penup()
-
-            # only check bottom wall if on lowest row
-            if y == 0 and not testmaze.is_permissible([x,y], 'down'):
-                wally.goto(origin + sq_size * x, origin)
-                wally.setheading(0)
-                wally.pendown()
-                wally.forward(sq_size)
-                wally.penup()
-
-            # only check left wall if on leftmost column
-            if x == 0 and not testmaze.is_permissible([x,y], 'left'):
-                wally.goto(origin, origin + sq_size * y)
-                wally.setheading(90)
-                wally.pendown()
-                wally.forward(sq_size)
-                wally.penup()
-
-    window.exitonclick()
\ No newline at end of file
+    args = sys.argv[1:]
+    seed = None
+    if '--run' in args:
+        k = args.index('--run')
+        seed = int(args[k + 1])
+        del args[k:k + 2]
+
+    if seed is None:
+        for filename in render_corpus(args, 'images'):
+            print(filename)
+    else:
+        testmaze = Maze(args[0])
+        robots = []
+
+        def robot_factory(dim):
+            robots.append(Robot(dim, seed=seed))
+            return robots[-1]
+
+        result = Simulator(testmaze, robot_factory).run()
+        filename = os.path.join('images', '{}-run{}.png'.format(os.path.splitext(os.path.basename(args[0]))[0], seed))
+        write_png(filename, render(testmaze.walls, mapper=robots[0].planner.maps, paths=result.path))
+        print(filename)
@@ -0,0 +1,260 @@
+import numpy as np
+
+# headings as integers, in the bit order of the maze walls: up, right, down, left
+headings = ['u', 'r', 'd', 'l']
+heading_moves = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+
+# heading offset applied by each valid rotation
+rotation_offsets = {-90: 3, 0: 0, 90: 1}
+
+# flags of the steps in a run trace, see runtrace
+flag_reset, flag_invalid_rotation, flag_wall, flag_goal = 1, 2, 4, 8
+
+# test and score parameters
+max_time = 1000
+train_score_mult = 1/30.
+
+
+class SimulationResult(object):
+    def __init__(self):
+        self.runtimes = []  # time steps of each completed run
+        self.hit_goal = [False, False]  # whether each run entered the goal
+        self.moves = [[], []]  # (rotation, movement) of every step in each run
+        self.path = [[], []]  # location of the robot after every step in each run
+        self.timed_out = False
+
+    @property
+    def completed(self):
+        return len(self.runtimes) == 2
+
+    @property
+    def score(self):
+        if not self.completed:
+            return None
+        return self.runtimes[1] + train_score_mult*self.runtimes[0]
+
+
+class Simulator(object):
+    def __init__(self, maze, robot_factory, log=None, runs=(0, 1), train_time=0, trace=None):
+        '''
+        Runs the two trials of a robot in a maze without any console output.
+        robot_factory is called with the maze dimension and returns an object
+        with a next_move(sensors) method, like Robot. Messages the tester
+        would print are passed to log, if given. runs selects the trials to
+        run: runs=(0,) stops after the training run, and runs=(1,) races a
+        robot that was trained before, e.g. restored from a snapshot, with
+        train_time as the time steps of its training run. Every step is
+        recorded to trace, if given, e.g. a runtrace.TraceWriter.
+        '''
+        self.maze = maze
+        self.robot_factory = robot_factory
+        self.log = log
+        self.runs = runs
+        self.train_time = train_time
+        self.trace = trace
+
+    def run(self):
+        records = [] if self.trace is not None else None
+        try:
+            return self.run_trials(records)
+        finally:
+            if records is not None:
+                self.trace.write(records)
+
+    def run_trials(self, records):
+        # appends a record of every step to records, unless it is None
+        maze, log = self.maze, self.log
+        robot = self.robot_factory(maze.dim)
+        result = SimulationResult()
+
+        ray = maze.ray.tolist()  # nested lists are faster to index than arrays
+        goal_bounds = (maze.dim // 2 - 1, maze.dim // 2)
+
+        total_time = 0
+        if 0 not in self.runs:
+            # the training run ended before, but still counts towards the score
+            total_time = self.train_time
+            result.runtimes.append(total_time)
+            result.hit_goal[0] = True
+
+        for run in self.runs:
+            if log:
+                log("Starting run {}.".format(run))
+
+            # robot starts in the bottom left corner, facing up
+            x, y, heading = 0, 0, 0
+            seen = set([(x, y)])
+
+            while True:
+                # check for end of time
+                total_time += 1
+                if total_time > max_time:
+                    result.timed_out = True
+                    if log:
+                        log("Allotted time exceeded.")
+                    return result
+
+                # provide robot with sensor information, get actions
+                sensing = self.sense(ray[x][y], heading)
+                rotation, movement = robot.next_move(sensing)
+                result.moves[run].append((rotation, movement))
+
+                # check for a reset
+                if rotation == 'Reset' and movement == 'Reset':
+                    if records is not None:
+                        records.append((run, total_time, x, y, heading, sensing, 0, 0,
+                                        x, y, flag_reset, len(seen)))
+                    if run == 0 and result.hit_goal[0]:
+                        result.runtimes.append(total_time)
+                        if log:
+                            log("Ending first run. Starting next run.")
+                        break
+                    if log:
+                        if run == 0:
+                            log("Cannot reset - robot has not hit goal yet.")
+                        else:
+                            log("Cannot reset on runs after the first.")
+                    continue
+
+                # perform rotation
+                before = (x, y, heading)
+                if rotation in rotation_offsets:
+                    heading = (heading + rotation_offsets[rotation]) % 4
+                elif log:
+                    log("Invalid rotation value, no rotation performed.")
+
+                # perform movement, stopping at the first wall
+                if log and abs(movement) > 3:
+                    log("Movement limited to three squares in a turn.")
+                movement = max(min(int(movement), 3), -3)  # fix to range [-3, 3]
+                direction = heading if movement > 0 else (heading + 2) % 4
+                steps = min(abs(movement), ray[x][y][direction])
+                if log and steps < abs(movement):
+                    log("Movement stopped by wall.")
+                x += heading_moves[direction][0] * steps
+                y += heading_moves[direction][1] * steps
+                result.path[run].append((x, y))
+                in_goal = x in goal_bounds and y in goal_bounds
+
+                if records is not None:
+                    seen.add((x, y))
+                    valid = rotation in rotation_offsets
+                    flags = ((0 if valid else flag_invalid_rotation) |
+                             (flag_wall if steps < abs(movement) else 0) |
+                             (flag_goal if in_goal else 0))
+                    records.append((run, total_time) + before + (sensing, rotation if valid else 0, movement,
+                                                                x, y, flags, len(seen)))
+
+                # check for goal entered
+                if in_goal:
+                    result.hit_goal[run] = True
+                    if run != 0:
+                        result.runtimes.append(total_time - sum(result.runtimes))
+                        if log:
+                            log("Goal found; run {} completed!".format(run))
+                        break
+
+        return result
+
+    def sense(self, rays, heading):
+        # distances seen by the left, front and right sensors, from the ray
+        # table entries of the robot's cell
+        return [rays[(heading + 3) % 4], rays[heading], rays[(heading + 1) % 4]]
+
+
+class BatchSimulator(object):
+    def __init__(self, mazes, robot_factory=None, controller=None):
+        '''
+        Runs the two trials of one robot per maze in lockstep. Walls (as ray
+        tables), locations and headings of all robots are stacked arrays, so
+        sensing, rotation and movement are computed for every robot at once.
+        The moves of all robots are asked from a controller in one batch,
+        by default a controller.LocalController of robot_factory; with a
+        RemoteController that is a single round trip per time step. Mazes
+        may differ in size. Returns the same results as Simulator, in maze
+        order.
+        '''
+        self.mazes = mazes
+        if controller is None:
+            # imported here, so that importing the simulator stays free of sockets and processes
+            from controller import LocalController
+            controller = LocalController(robot_factory)
+        self.controller = controller
+
+    def run(self):
+        n = len(self.mazes)
+        dims = np.array([maze.dim for maze in self.mazes])
+        controller = self.controller
+        controller.new(list(range(n)), dims.tolist())
+        results = [SimulationResult() for _ in range(n)]
+
+        # ray tables of all mazes, padded to the largest one
+        rays = np.zeros((n, dims.max(), dims.max(), 4), dtype=np.uint8)
+        for i, maze in enumerate(self.mazes):
+            rays[i, :maze.dim, :maze.dim] = maze.ray
+        goal_low, goal_high = dims // 2 - 1, dims // 2
+
+        move_x = np.array([dx for dx, dy in heading_moves])
+        move_y = np.array([dy for dx, dy in heading_moves])
+
+        x = np.zeros(n, dtype=int)
+        y = np.zeros(n, dtype=int)
+        heading = np.zeros(n, dtype=int)
+        run = np.zeros(n, dtype=int)
+        total_time = np.zeros(n, dtype=int)
+        active = np.ones(n, dtype=bool)
+
+        while active.any():
+            # check for end of time
+            ids = np.flatnonzero(active)
+            total_time[ids] += 1
+            for i in ids[total_time[ids] > max_time]:
+                results[i].timed_out = True
+                active[i] = False
+            ids = ids[total_time[ids] <= max_time]
+
+            # provide robots with sensor information, get actions
+            cell_rays = rays[ids, x[ids], y[ids]]
+            h, k = heading[ids], np.arange(len(ids))
+            sensing = np.stack([cell_rays[k, (h + 3) % 4], cell_rays[k, h], cell_rays[k, (h + 1) % 4]], axis=1)
+
+            moving, offsets, movements = [], [], []
+            moves = controller.next_moves(ids.tolist(), sensing.tolist())
+            for i, (rotation, movement) in zip(ids.tolist(), moves):
+                results[i].moves[run[i]].append((rotation, movement))
+
+                # check for a reset; robots that may not reset just stay put
+                if rotation == 'Reset' and movement == 'Reset':
+                    if run[i] == 0 and results[i].hit_goal[0]:
+                        results[i].runtimes.append(int(total_time[i]))
+                        run[i], x[i], y[i], heading[i] = 1, 0, 0, 0
+                    continue
+
+                moving.append(i)
+                offsets.append(rotation_offsets.get(rotation, 0))
+                movements.append(max(min(int(movement), 3), -3))  # fix to range [-3, 3]
+            if not moving:
+                continue
+
+            # perform rotation and movement, stopping at the first wall
+            ids = np.array(moving)
+            movements = np.array(movements)
+            heading[ids] = (heading[ids] + offsets) % 4
+            direction = np.where(movements > 0, heading[ids], (heading[ids] + 2) % 4)
+            steps = np.minimum(np.abs(movements), rays[ids, x[ids], y[ids], direction])
+            x[ids] += move_x[direction] * steps
+            y[ids] += move_y[direction] * steps
+
+            # check for goal entered
+            in_goal = (((x[ids] == goal_low[ids]) | (x[ids] == goal_high[ids])) &
+                       ((y[ids] == goal_low[ids]) | (y[ids] == goal_high[ids])))
+            for i, location, goal in zip(ids.tolist(), zip(x[ids].tolist(), y[ids].tolist()), in_goal):
+                result = results[i]
+                result.path[run[i]].append(location)
+                if goal:
+                    result.hit_goal[run[i]] = True
+                    if run[i] != 0:
+                        result.runtimes.append(int(total_time[i]) - sum(result.runtimes))
+                        active[i] = False
+
+        return results
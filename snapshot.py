@@ -0,0 +1,128 @@
+'''
+Saves the knowledge of a Planner and its Mapper to a directory and loads it
+back, so that many race runs can start from one training run, e.g.
+
+    result = train_snapshot(Maze('test_maze_01.txt'), 'stats/snapshot_01', seed=0)
+    result = race_snapshot(Maze('test_maze_01.txt'), 'stats/snapshot_01')
+
+The arrays are stored as .npy files: walls and known as uint8 grids, the
+visited indices as a bitset and the move graph in sparse form, as the flat
+slots of the neighbour table that hold a move and the index they lead to.
+Everything else goes into meta.json. Grids are memory-mapped copy-on-write
+when loaded, so changes of the restored planner never reach the snapshot.
+'''
+from mapper import cardinal_points, wall_bits, no_move
+from planner import Planner
+from robot import Robot
+from simulator import Simulator
+import json
+import numpy as np
+import os
+
+snapshot_version = 1
+
+
+def save_snapshot(planner, path, train_time=None):
+    # writes the state of planner to the directory path
+    maps = planner.maps
+    if not os.path.isdir(path):
+        os.makedirs(path)
+
+    np.save(os.path.join(path, 'walls.npy'), maps.walls)
+    np.save(os.path.join(path, 'known.npy'), maps.known)
+
+    visited = np.zeros(planner.dim ** 2, dtype=bool)
+    visited[list(maps.visited)] = True
+    np.save(os.path.join(path, 'visited.npy'), np.packbits(visited))
+
+    moves = maps.A1.ravel()
+    slots = np.flatnonzero(moves != no_move).astype(np.uint32)
+    np.save(os.path.join(path, 'move_slots.npy'), slots)
+    np.save(os.path.join(path, 'move_indices.npy'), moves[slots])
+
+    version, state, gauss = planner.rng.getstate()
+    meta = {'version': snapshot_version, 'dim': planner.dim,
+            'params': [planner.min_percentage], 'strategy': planner.strategy,
+            'loc': [int(l) for l in planner.loc], 'heading': planner.heading,
+            'found_goal': planner.found_goal, 'found_goal_idx': int(planner.found_goal_idx),
+            'found_shortest_path': planner.found_shortest_path,
+            'optimal_steps': [[r, m] for r, m in planner.optimal_steps or []],
+            'rng_state': [version, list(state), gauss], 'train_time': train_time}
+    with open(os.path.join(path, 'meta.json'), 'w') as f_out:
+        json.dump(meta, f_out)
+
+
+def read_meta(path):
+    with open(os.path.join(path, 'meta.json')) as f_in:
+        meta = json.load(f_in)
+    if meta['version'] != snapshot_version:
+        raise Exception('Snapshot {} has version {}, expected {}!'.format(
+            path, meta['version'], snapshot_version))
+    return meta
+
+
+def load_snapshot(path, sink=None):
+    '''
+    Returns a Planner with the state saved in the directory path. Its walls
+    and known grids are copy-on-write memory maps of the snapshot files.
+    '''
+    meta = read_meta(path)
+    dim = meta['dim']
+    planner = Planner(dim, meta['params'], sink=sink, strategy=meta['strategy'])
+    maps = planner.maps
+
+    maps.walls = np.load(os.path.join(path, 'walls.npy'), mmap_mode='c')
+    maps.known = np.load(os.path.join(path, 'known.npy'), mmap_mode='c')
+
+    visited = np.unpackbits(np.load(os.path.join(path, 'visited.npy')))[:dim ** 2]
+    maps.visited = set(np.flatnonzero(visited).tolist())
+
+    # fill the neighbour table in place, the shortest paths keep a reference to it
+    slots = np.load(os.path.join(path, 'move_slots.npy'))
+    maps.A1.ravel()[slots] = np.load(os.path.join(path, 'move_indices.npy'))
+    maps.paths.rebuild()
+    maps.build_tree_rep()
+
+    if planner.flood:
+        planner.flood.close_walls(closed_walls(maps.walls, maps.known))
+
+    planner.loc, planner.heading = meta['loc'], meta['heading']
+    planner.found_goal, planner.found_goal_idx = meta['found_goal'], meta['found_goal_idx']
+    planner.found_shortest_path = meta['found_shortest_path']
+    planner.optimal_steps = [tuple(step) for step in meta['optimal_steps']]
+
+    version, state, gauss = meta['rng_state']
+    planner.rng.setstate((version, tuple(state), gauss))
+    return planner
+
+
+def closed_walls(walls, known):
+    # (idx, cardinal) of every wall seen closed, including the outer walls
+    dim = len(walls)
+    closed = known & ~walls
+    return [(int(x + y*dim), cardinal) for cardinal in cardinal_points
+            for x, y in zip(*np.nonzero(closed & wall_bits[cardinal]))]
+
+
+def train_snapshot(maze, path, params=[], seed=None, strategy='reward'):
+    # runs the training run of a robot in maze and saves its planner to path
+    robots = []
+
+    def robot_factory(dim):
+        robots.append(Robot(dim, params, seed, strategy=strategy))
+        return robots[-1]
+
+    result = Simulator(maze, robot_factory, runs=(0,)).run()
+    if result.runtimes:
+        save_snapshot(robots[0].planner, path, train_time=result.runtimes[0])
+    return result
+
+
+def race_snapshot(maze, path, log=None):
+    # races a robot restored from the snapshot at path through maze; the
+    # score of a snapshot saved without its training time counts the race only
+    meta = read_meta(path)
+    if not meta['found_shortest_path']:
+        raise Exception('Snapshot {} was taken before the end of its training run!'.format(path))
+    return Simulator(maze, lambda dim: Robot(dim, planner=load_snapshot(path)), log,
+                     runs=(1,), train_time=meta['train_time'] or 0).run()
@@ -0,0 +1,143 @@
+from maze import Maze
+from robot import Robot
+from simulator import Simulator
+from resultcache import maze_hash, code_version
+from corpus import MazeCorpus
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import json
+import os
+import traceback
+
+# mazes already loaded by this (worker) process, by file name, and the
+# corpus mazes are taken from when it holds them
+_mazes = dict()
+_corpus = None
+
+
+def use_corpus(path):
+    # memory-maps the corpus at path in this process, no corpus if None
+    global _corpus
+    _corpus = MazeCorpus.load(path) if path else None
+    _mazes.clear()
+
+
+def load_maze(maze_name):
+    if maze_name not in _mazes:
+        if _corpus is not None and maze_name in _corpus:
+            _mazes[maze_name] = _corpus.maze(maze_name)
+        else:
+            _mazes[maze_name] = Maze(maze_name)
+    return _mazes[maze_name]
+
+
+def job_maze_hash(maze_name):
+    # None for mazes that fail to load, their jobs report the error
+    try:
+        return maze_hash(load_maze(maze_name))
+    except Exception:
+        return None
+
+
+def job_key(maze_name, params, seed):
+    return maze_name, tuple(params), seed
+
+
+def sweep_jobs(mazes, param_sets, repeats):
+    # one (maze, params, seed) job per repeat of every combination
+    return [(m, tuple(p), seed) for m in mazes for p in param_sets for seed in range(repeats)]
+
+
+def run_job(job):
+    '''
+    Simulates one (maze, params, seed) job and returns its result record.
+    Failures are reported in the record instead of being raised, so one
+    broken run does not take down the whole sweep.
+    '''
+    maze_name, params, seed = job
+    record = {'maze': maze_name, 'params': list(params), 'seed': seed,
+              'score': None, 'runtimes': [], 'error': None}
+    try:
+        result = Simulator(load_maze(maze_name), lambda dim: Robot(dim, list(params), seed)).run()
+        record['score'] = result.score
+        record['runtimes'] = result.runtimes
+    except Exception:
+        record['error'] = traceback.format_exc()
+    return record
+
+
+def load_results(path):
+    # records of a previous (possibly interrupted) sweep; a last line cut
+    # off by the interruption is skipped, so its job runs again
+    records = []
+    if os.path.exists(path):
+        with open(path, 'r') as f_in:
+            lines = [line for line in f_in if line.strip()]
+        for k, line in enumerate(lines):
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                if k != len(lines) - 1:
+                    raise
+    return records
+
+
+def drop_partial_line(path):
+    # cuts off a last line left unfinished, so new records start on a line of their own
+    if os.path.exists(path):
+        with open(path, 'rb+') as f_out:
+            data = f_out.read()
+            if data and not data.endswith(b'\n'):
+                f_out.truncate(data.rfind(b'\n') + 1)
+
+
+def run_sweep(jobs, out_path, workers=None, log=None, cache=None, corpus=None):
+    '''
+    Runs the jobs over a pool of worker processes and appends each record to
+    out_path (one JSON object per line) as soon as it finishes. Jobs that
+    already have an error free record in out_path are not run again, so an
+    interrupted sweep resumes where it stopped. Records carry the hash of the
+    maze walls and the version of the simulation code, and records of other
+    walls or code are run again. With a ResultCache, jobs whose maze walls,
+    parameters and seed were simulated before by the same code are taken
+    from the cache, and new records are added to it. Mazes found in the
+    corpus at the path corpus are taken from there, shared by all workers,
+    instead of being read from their files.
+    Returns all records for jobs.
+    '''
+    use_corpus(corpus)
+    version = cache.version if cache else code_version()
+    hashes = dict((m, job_maze_hash(m)) for m in set(job[0] for job in jobs))
+    done = dict()
+    for record in load_results(out_path):
+        if (record['error'] is None and record.get('code_version') == version and
+                record.get('maze_hash') is not None and record['maze_hash'] == hashes.get(record['maze'])):
+            done[job_key(record['maze'], record['params'], record['seed'])] = record
+
+    if cache:
+        for job in jobs:
+            if job_key(*job) not in done:
+                record = cache.get(hashes[job[0]], job[1], job[2])
+                if record is not None:
+                    record['maze'] = job[0]
+                    done[job_key(*job)] = record
+
+    records = [done[job_key(*job)] for job in jobs if job_key(*job) in done]
+    pending = [job for job in jobs if job_key(*job) not in done]
+    if not pending:
+        return records
+
+    drop_partial_line(out_path)
+    with open(out_path, 'a') as f_out:
+        with ProcessPoolExecutor(max_workers=workers, initializer=use_corpus, initargs=(corpus,)) as executor:
+            futures = [executor.submit(run_job, job) for job in pending]
+            for future in as_completed(futures):
+                record = future.result()
+                record['maze_hash'], record['code_version'] = hashes[record['maze']], version
+                f_out.write(json.dumps(record) + '\n')
+                f_out.flush()
+                if cache and record['error'] is None:
+                    cache.put(hashes[record['maze']], record)
+                records.append(record)
+                if log:
+                    log(record)
+    return records